@@ -0,0 +1,247 @@
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from array_pst import (
+    ArrayPSTRangeSearch,
+    ArrayPSTSearch,
+    buildArrayPST,
+    buildArrayPSTFromArrays,
+)
+from priority_search_tree import generate_points
+
+
+class AppendPST:
+    """
+    Append-optimized PST built with the logarithmic method (Bentley-Saxe).
+    New points go to a small unindexed buffer; a full buffer becomes a static
+    ArrayPST component. Components are kept at sizes buffer_size * 2**level
+    and, like carries in a binary counter, components that collide on a level
+    are merged into one twice as large, so there are O(log n) components and
+    every point is rebuilt O(log n) times. Queries search every component and
+    scan the buffer.
+    With background=True merges are built in a worker process, so inserts
+    and queries keep running on the old components until the merged one is
+    swapped in. If points arrive faster than the worker merges, components
+    pile up and queries slow down until it catches up; wait() blocks until
+    it has. If a background merge fails, its components stay in place and
+    the error is raised as a RuntimeError by the next insert(), flush() or
+    wait(). Use as a context manager, or call close() when done.
+    Args:
+        buffer_size: Number of points collected before they are indexed
+        background: Build merged components in a worker process
+    """
+
+    def __init__(self, buffer_size=4096, background=True):
+        self.buffer_size = buffer_size
+        self.buffer_x = []
+        self.buffer_y = []
+        self.components = []
+        self.merges = 0
+        self.merged_points = 0
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._merging = None
+        self._error = None
+        self._executor = ProcessPoolExecutor(max_workers=1) if background else None
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(tree) for tree in self.components) + len(self.buffer_x)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError("background merge failed") from error
+
+    def insert(self, x, y):
+        if self._error is not None:
+            self._raise_error()
+        self.buffer_x.append(x)
+        self.buffer_y.append(y)
+        if len(self.buffer_x) >= self.buffer_size:
+            self.flush()
+
+    def extend(self, points):
+        for x, y in points:
+            self.insert(x, y)
+
+    def flush(self):
+        """Index the buffered points now, even if the buffer is not full."""
+        self._raise_error()
+        if not self.buffer_x:
+            return
+        tree = buildArrayPSTFromArrays(np.array(self.buffer_x), np.array(self.buffer_y))
+        with self._lock:
+            self.components.append(tree)
+            self.buffer_x = []
+            self.buffer_y = []
+        self._schedule()
+
+    def wait(self):
+        """Block until no merge is running or due."""
+        with self._idle:
+            while self._merging is not None:
+                self._idle.wait()
+            self._raise_error()
+
+    def _level(self, tree):
+        return (len(tree) // self.buffer_size).bit_length() - 1
+
+    def _pick_merge(self):
+        # Lowest level holding two or more components (more when background
+        # merges fall behind), plus the carry chain above it
+        by_level = {}
+        for tree in self.components:
+            by_level.setdefault(self._level(tree), []).append(tree)
+        for level in sorted(by_level):
+            if len(by_level[level]) >= 2:
+                group = by_level[level]
+                level += 1
+                while level in by_level:
+                    group.append(by_level[level][0])
+                    level += 1
+                return group
+        return None
+
+    def _schedule(self):
+        while True:
+            with self._lock:
+                if self._merging is not None:
+                    return
+                group = self._pick_merge()
+                if group is None:
+                    return
+                x = np.concatenate([tree.x for tree in group])
+                y = np.concatenate([tree.y for tree in group])
+                if self._executor is not None:
+                    self._merging = self._executor.submit(buildArrayPSTFromArrays, x, y)
+                    self._merging.add_done_callback(
+                        lambda future, group=group: self._merged(group, future)
+                    )
+                    return
+            self._replace(group, buildArrayPSTFromArrays(x, y))
+
+    def _merged(self, group, future):
+        # Runs in the executor's callback thread, where exceptions are lost,
+        # so failures are kept for the caller and waiters are always woken
+        with self._lock:
+            try:
+                self._replace(group, future.result())
+                self._merging = None
+                self._schedule()
+            except BaseException as exc:
+                self._error = exc
+                self._merging = None
+            finally:
+                if self._merging is None:
+                    self._idle.notify_all()
+
+    def _replace(self, group, tree):
+        with self._lock:
+            merged = set(map(id, group))
+            self.components = [
+                component for component in self.components if id(component) not in merged
+            ]
+            self.components.append(tree)
+            self.merges += 1
+            self.merged_points += len(tree)
+
+    def search(self, x1, x2, y1):
+        """Three-sided query, like PSTSearch."""
+        with self._lock:
+            components = list(self.components)
+        result = []
+        for tree in components:
+            result.extend(ArrayPSTSearch(x1, x2, y1, tree))
+        for x, y in zip(self.buffer_x, self.buffer_y):
+            if x1 <= x <= x2 and y >= y1:
+                result.append((x, y))
+        return result
+
+    def range_search(self, x1, x2, y1, y2):
+        """Four-sided query, like PSTRangeSearch."""
+        with self._lock:
+            components = list(self.components)
+        result = []
+        for tree in components:
+            result.extend(ArrayPSTRangeSearch(x1, x2, y1, y2, tree))
+        for x, y in zip(self.buffer_x, self.buffer_y):
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                result.append((x, y))
+        return result
+
+
+def test_ingest_vs_query(n=1_000_000, batch=10_000, queries_per_batch=100):
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    print(f"Testing with {n} points appended in batches of {batch}...")
+
+    def run(name, index, insert_batch, query):
+        insert_time = 0.0
+        latencies = []
+        for start in range(0, n, batch):
+            start_time = time.perf_counter()
+            insert_batch(points[start : start + batch])
+            insert_time += time.perf_counter() - start_time
+            for _ in range(queries_per_batch):
+                x1 = random.randint(0, 10**6 - 10**4)
+                y1 = random.randint(0, 10**6 - 10**4)
+                start_time = time.perf_counter()
+                query(x1, x1 + 10**4, y1, y1 + 10**4)
+                latencies.append(time.perf_counter() - start_time)
+        print(
+            f"{name}: {n / insert_time:.0f} points/s ingest, query "
+            f"p50 {np.percentile(latencies, 50) * 1e6:.0f} us, "
+            f"p99 {np.percentile(latencies, 99) * 1e6:.0f} us"
+        )
+        if index is not None:
+            print(
+                f"{name}: {len(index.components)} components, {index.merges} merges, "
+                f"{index.merged_points / n:.1f} rebuilds per point"
+            )
+
+    for background in [False, True]:
+        with AppendPST(background=background) as index:
+            run(
+                "Background merges" if background else "Inline merges",
+                index,
+                index.extend,
+                index.range_search,
+            )
+
+    if n <= 200_000:
+        # Rebuilding everything after each batch, for comparison
+        indexed = []
+        tree = None
+
+        def rebuild(new_points):
+            nonlocal tree
+            indexed.extend(new_points)
+            tree = buildArrayPST(indexed)
+
+        run(
+            "Full rebuild",
+            None,
+            rebuild,
+            lambda x1, x2, y1, y2: ArrayPSTRangeSearch(x1, x2, y1, y2, tree),
+        )
+
+
+if __name__ == "__main__":
+    test_ingest_vs_query()
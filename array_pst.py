@@ -0,0 +1,729 @@
+import struct
+import time
+
+import numpy as np
+
+from priority_search_tree import _PSTBuilder, buildPSTFast, generate_points
+
+# Node arrays of an ArrayPST, in constructor order
+_NODE_ARRAYS = ("x", "y", "median", "left", "right", "index")
+
+
+class ArrayPST:
+    """
+    Priority Search Tree stored as parallel arrays (struct-of-arrays).
+    Node i holds the point (x[i], y[i]), its median and the indices of its
+    children (-1 when missing); index[i] is the position of the point in the
+    input list. The root is node 0; the other nodes are numbered in
+    breadth-first order, or in van Emde Boas order (see _veb_order) when
+    built with layout="veb". The median split does not produce a complete
+    tree, so child indices are stored explicitly instead of being computed
+    as 2i + 1 / 2i + 2.
+    Optional side arrays are indexed by input position rather than by node:
+    ids[r] is the integer id of input point r and payload maps column names
+    to arrays of per-point values, so the positions returned by the *Indices
+    searches gather them with fancy indexing. save_pst writes them too.
+    """
+
+    def __init__(self, x, y, median, left, right, index, ids=None, payload=None):
+        self.x = x
+        self.y = y
+        self.median = median
+        self.left = left
+        self.right = right
+        self.index = index
+        self.ids = ids
+        self.payload = payload if payload is not None else {}
+
+    def __len__(self):
+        return len(self.x)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in _NODE_ARRAYS}
+
+    def sections(self):
+        """Node arrays, then "ids" and "payload[<name>]" columns when present."""
+        sections = dict(self.arrays())
+        if self.ids is not None:
+            sections["ids"] = self.ids
+        for name, column in self.payload.items():
+            sections[f"payload[{name}]"] = column
+        return sections
+
+    @classmethod
+    def from_sections(cls, sections):
+        """Rebuild an ArrayPST from a {name: array} dict like sections() returns."""
+        payload = {
+            name[len("payload[") : -1]: column
+            for name, column in sections.items()
+            if name.startswith("payload[")
+        }
+        return cls(
+            **{name: sections[name] for name in _NODE_ARRAYS},
+            ids=sections.get("ids"),
+            payload=payload,
+        )
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+
+def _pst_layout(xs, ys):
+    """
+    Lay out the PST over points presorted by x in breadth-first order.
+    Nodes are numbered when they are discovered, so the range of every node
+    waiting to be laid out is kept in arrays indexed by node number instead
+    of a queue of tuples, and the build needs a few machine words per point.
+    Args:
+        xs: Array of x-coordinates sorted ascending
+        ys: Array of y-coordinates in the same order as xs
+    Returns:
+        (pos, median, left, right) arrays where pos[i] is the sorted position
+        of the point stored at node i.
+    """
+    n = len(xs)
+    index_dtype = np.int32 if n < 2**31 else np.int64
+    pos = np.empty(n, dtype=index_dtype)
+    medians = np.empty(n, dtype=xs.dtype)
+    left = np.full(n, -1, dtype=index_dtype)
+    right = np.full(n, -1, dtype=index_dtype)
+    if not n:
+        return pos, medians, left, right
+
+    # memoryviews hand back and take plain Python numbers, so the builder
+    # runs at list speed and medians of int32 coordinates cannot overflow
+    builder = _PSTBuilder(memoryview(xs), memoryview(ys))
+    ranges = np.empty((3, n), dtype=index_dtype)
+    lo, hi, count = (memoryview(row) for row in ranges)
+    node_pos, node_median, node_left, node_right = (
+        memoryview(values) for values in (pos, medians, left, right)
+    )
+    lo[0], hi[0], count[0] = 0, n, n
+    nodes = 1
+    for node in range(n):
+        p, median, split, m_left, m_right = builder.take(
+            lo[node], hi[node], count[node]
+        )
+        node_pos[node] = p
+        node_median[node] = median
+        if m_left:
+            node_left[node] = nodes
+            lo[nodes], hi[nodes], count[nodes] = lo[node], split, m_left
+            nodes += 1
+        if m_right:
+            node_right[node] = nodes
+            lo[nodes], hi[nodes], count[nodes] = split, hi[node], m_right
+            nodes += 1
+
+    return pos, medians, left, right
+
+
+def _tree_height(left, right):
+    height = 0
+    frontier = np.zeros(1 if len(left) else 0, dtype=np.int64)
+    while len(frontier):
+        height += 1
+        children = np.concatenate([left[frontier], right[frontier]])
+        frontier = children[children >= 0]
+    return height
+
+
+def _veb_order(left, right):
+    """
+    Van Emde Boas order of the nodes of a tree with explicit child links.
+    A tree of height h is cut at depth h // 2: the top part is laid out
+    recursively, followed by each bottom subtree laid out recursively. Any
+    root-to-leaf path then crosses O(log_B n) blocks of B consecutive nodes
+    for every B at once, instead of one block per level as in BFS order.
+    Returns:
+        Array of old node numbers in their new order; the root stays first.
+    """
+    height = _tree_height(left, right)
+    left = left.tolist()
+    right = right.tolist()
+    order = []
+
+    def lay_out(root, h):
+        if h == 1:
+            order.append(root)
+            return
+        top = h // 2
+        lay_out(root, top)
+        frontier = [root]
+        for _ in range(top):
+            frontier = [
+                child
+                for node in frontier
+                for child in (left[node], right[node])
+                if child >= 0
+            ]
+        for child in frontier:
+            lay_out(child, h - top)
+
+    if height:
+        lay_out(0, height)
+    return np.array(order, dtype=np.int64)
+
+
+def _relabel(tree, order):
+    """Renumber the nodes of an ArrayPST so that old node order[i] becomes i."""
+    new_id = np.empty(len(order), dtype=tree.left.dtype)
+    new_id[order] = np.arange(len(order), dtype=tree.left.dtype)
+    left = tree.left[order]
+    right = tree.right[order]
+    return ArrayPST(
+        x=tree.x[order],
+        y=tree.y[order],
+        median=tree.median[order],
+        left=np.where(left >= 0, new_id[left], -1).astype(tree.left.dtype),
+        right=np.where(right >= 0, new_id[right], -1).astype(tree.right.dtype),
+        index=tree.index[order],
+        ids=tree.ids,
+        payload=tree.payload,
+    )
+
+
+def buildArrayPST(points, dtype=None, layout="bfs", ids=None, payload=None):
+    """
+    Build an array-backed PST with the same shape as buildPST.
+    Args:
+        points: List of points (x, y), in any order
+        dtype: NumPy dtype for x, y and median (inferred from the points if None)
+        layout: Node order, "bfs" (breadth-first) or "veb" (van Emde Boas)
+        ids: Optional integer id of each point
+        payload: Optional {column name: array} of per-point values
+    Returns:
+        An ArrayPST.
+    """
+    coords = np.array(points, dtype=dtype).reshape(-1, 2)
+    return buildArrayPSTFromArrays(
+        coords[:, 0], coords[:, 1], layout=layout, ids=ids, payload=payload
+    )
+
+
+def buildArrayPSTFromArrays(x, y, dtype=None, layout="bfs", ids=None, payload=None):
+    """
+    Build an ArrayPST from separate coordinate arrays, without point tuples.
+    Args:
+        x: Array of x-coordinates, in any order
+        y: Array of y-coordinates in the same order as x
+        dtype: NumPy dtype for x, y and median (common type of x and y if None)
+        layout: Node order, "bfs" (breadth-first) or "veb" (van Emde Boas)
+        ids: Optional integer id of each point, in the same order as x
+        payload: Optional {column name: array} of per-point values, each in
+            the same order as x
+    Returns:
+        An ArrayPST whose index refers to positions in x and y.
+    Raises:
+        ValueError: If layout is not "bfs" or "veb", or ids or a payload
+            column does not have one value per point.
+    """
+    if layout not in ("bfs", "veb"):
+        raise ValueError(f"Unknown layout {layout!r}, expected 'bfs' or 'veb'")
+    if ids is not None:
+        ids = np.asarray(ids, dtype=np.int64)
+    payload = {name: np.asarray(column) for name, column in (payload or {}).items()}
+    for name, column in [("ids", ids), *payload.items()]:
+        if column is not None and len(column) != len(x):
+            raise ValueError(f"{name} has {len(column)} values for {len(x)} points")
+    if dtype is None:
+        dtype = np.result_type(np.asarray(x), np.asarray(y))
+    # Native byte order, which the memoryviews of _pst_layout need
+    dtype = np.dtype(dtype).newbyteorder("=")
+    x = np.asarray(x, dtype=dtype)
+    y = np.asarray(y, dtype=dtype)
+    order = np.argsort(x, kind="stable")
+    xs = x[order]
+    ys = y[order]
+    pos, medians, left, right = _pst_layout(xs, ys)
+    tree = ArrayPST(
+        x=xs[pos],
+        y=ys[pos],
+        median=medians,
+        left=left,
+        right=right,
+        index=order[pos].astype(left.dtype),
+        ids=ids,
+        payload=payload,
+    )
+    if layout == "veb":
+        tree = _relabel(tree, _veb_order(tree.left, tree.right))
+    return tree
+
+
+def bytes_per_point(tree):
+    if len(tree) == 0:
+        return 0.0
+    return tree.nbytes() / len(tree)
+
+
+def ArrayPSTSearch(x1, x2, y1, tree):
+    """
+    Three-sided search x1 <= x <= x2, y >= y1 on an ArrayPST.
+    Returns:
+        A list of points (x, y), like PSTSearch.
+    """
+    if len(tree) == 0:
+        return []
+    # memoryviews hand back plain Python numbers, which is much faster than
+    # indexing the NumPy arrays one element at a time
+    xs = memoryview(tree.x)
+    ys = memoryview(tree.y)
+    medians = memoryview(tree.median)
+    left = memoryview(tree.left)
+    right = memoryview(tree.right)
+
+    result = []
+    stack = [0]
+    while stack:
+        i = stack.pop()
+        y = ys[i]
+        if y < y1:
+            continue
+        x = xs[i]
+        if x1 <= x <= x2:
+            result.append((x, y))
+        median = medians[i]
+        if x2 > median and right[i] >= 0:
+            stack.append(right[i])
+        if x1 <= median and left[i] >= 0:
+            stack.append(left[i])
+    return result
+
+
+def ArrayPSTRangeSearch(x1, x2, y1, y2, tree):
+    """
+    Four-sided search x1 <= x <= x2, y1 <= y <= y2 on an ArrayPST.
+    Subtrees are pruned on y1 (heap order) and on the medians, as in
+    PSTRangeSearchModify from compare_algorithm.py.
+    Returns:
+        A list of points (x, y).
+    """
+    if len(tree) == 0:
+        return []
+    xs = memoryview(tree.x)
+    ys = memoryview(tree.y)
+    medians = memoryview(tree.median)
+    left = memoryview(tree.left)
+    right = memoryview(tree.right)
+
+    result = []
+    stack = [0]
+    while stack:
+        i = stack.pop()
+        y = ys[i]
+        if y < y1:
+            continue
+        x = xs[i]
+        if x1 <= x <= x2 and y <= y2:
+            result.append((x, y))
+        median = medians[i]
+        if x2 > median and right[i] >= 0:
+            stack.append(right[i])
+        if x1 <= median and left[i] >= 0:
+            stack.append(left[i])
+    return result
+
+
+def _search_indices(x1, x2, y1, y2, tree, out, four_sided):
+    # One query walked level by level with NumPy, so hits stay in arrays
+    # and no Python object is created per reported point
+    if len(tree) == 0:
+        nodes = np.empty(0, dtype=np.int64)
+    else:
+        hits = []
+        frontier = np.zeros(1, dtype=np.int64)
+        while len(frontier):
+            y = tree.y[frontier]
+            alive = y >= y1
+            frontier = frontier[alive]
+            x = tree.x[frontier]
+            report = (x1 <= x) & (x <= x2)
+            if four_sided:
+                report &= y[alive] <= y2
+            hits.append(frontier[report])
+
+            median = tree.median[frontier]
+            left = tree.left[frontier[x1 <= median]]
+            right = tree.right[frontier[x2 > median]]
+            frontier = np.concatenate([left[left >= 0], right[right >= 0]])
+        nodes = np.concatenate(hits)
+
+    if out is None:
+        return tree.index[nodes].astype(np.int64)
+    if len(nodes) > len(out):
+        raise ValueError(f"{len(nodes)} results do not fit in a buffer of {len(out)}")
+    result = out[: len(nodes)]
+    result[:] = tree.index[nodes]
+    return result
+
+
+def ArrayPSTSearchIndices(x1, x2, y1, tree, out=None):
+    """
+    Three-sided search x1 <= x <= x2, y >= y1 returning input positions.
+    Meant for large results: the traversal is vectorized per tree level and
+    the hits are returned as one int64 array, so tree.ids[result] and
+    tree.payload[name][result] gather the matching records directly.
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        y1: Lower bound for y-coordinate
+        tree: The ArrayPST
+        out: Optional preallocated int64 array to write the positions into
+    Returns:
+        An int64 array of input positions; a view of out when it is given.
+    Raises:
+        ValueError: If out is too small for the result.
+    """
+    return _search_indices(x1, x2, y1, None, tree, out, four_sided=False)
+
+
+def ArrayPSTRangeSearchIndices(x1, x2, y1, y2, tree, out=None):
+    """
+    Four-sided search x1 <= x <= x2, y1 <= y <= y2 returning input positions.
+    Args:
+        out: Optional preallocated int64 array to write the positions into
+    Returns:
+        An int64 array of input positions, as for ArrayPSTSearchIndices.
+    Raises:
+        ValueError: If out is too small for the result.
+    """
+    return _search_indices(x1, x2, y1, y2, tree, out, four_sided=True)
+
+
+def _search_batch(queries, tree, four_sided):
+    queries = np.asarray(queries).reshape(-1, 4)
+    m = len(queries)
+    offsets = np.zeros(m + 1, dtype=np.int64)
+    if m == 0 or len(tree) == 0:
+        return offsets, np.empty(0, dtype=np.int64)
+    qx1, qx2, qy1, qy2 = queries.T
+
+    # One (query, node) pair per active query at the current level
+    qid = np.arange(m, dtype=np.int64)
+    node = np.zeros(m, dtype=np.int64)
+    hit_queries = []
+    hit_nodes = []
+    while len(qid):
+        y = tree.y[node]
+        alive = y >= qy1[qid]
+        qid = qid[alive]
+        node = node[alive]
+        y = y[alive]
+
+        x = tree.x[node]
+        report = (qx1[qid] <= x) & (x <= qx2[qid])
+        if four_sided:
+            report &= y <= qy2[qid]
+        hit_queries.append(qid[report])
+        hit_nodes.append(node[report])
+
+        median = tree.median[node]
+        left = tree.left[node]
+        right = tree.right[node]
+        go_left = (qx1[qid] <= median) & (left >= 0)
+        go_right = (qx2[qid] > median) & (right >= 0)
+        qid = np.concatenate([qid[go_left], qid[go_right]])
+        node = np.concatenate([left[go_left], right[go_right]]).astype(np.int64)
+
+    hit_queries = np.concatenate(hit_queries)
+    hit_nodes = np.concatenate(hit_nodes)
+    order = np.argsort(hit_queries, kind="stable")
+    np.cumsum(np.bincount(hit_queries, minlength=m), out=offsets[1:])
+    return offsets, tree.index[hit_nodes[order]].astype(np.int64)
+
+
+def PSTSearchBatch(queries, tree):
+    """
+    Answer many three-sided queries at once on an ArrayPST.
+    All active queries are advanced together one tree level at a time with
+    vectorized NumPy operations, so the Python overhead is paid per level
+    instead of per query and node.
+    Args:
+        queries: (m, 4) array of (x1, x2, y1, y2); y2 is ignored
+        tree: The ArrayPST
+    Returns:
+        (offsets, indices) in CSR form: the input positions of the points
+        matching query i are indices[offsets[i]:offsets[i + 1]].
+    """
+    return _search_batch(queries, tree, four_sided=False)
+
+
+def PSTRangeSearchBatch(queries, tree):
+    """
+    Answer many four-sided queries at once on an ArrayPST.
+    Args:
+        queries: (m, 4) array of (x1, x2, y1, y2)
+        tree: The ArrayPST
+    Returns:
+        (offsets, indices) in CSR form, as for PSTSearchBatch.
+    """
+    return _search_batch(queries, tree, four_sided=True)
+
+
+PST_MAGIC = b"PSTARRAY"
+PST_VERSION = 2
+_HEADER = struct.Struct("<8sIIQ")
+_SECTION = struct.Struct("<64s8sQ")
+# Version 1 stored the node arrays in _NODE_ARRAYS order, without names
+_SECTION_V1 = struct.Struct("<8sQ")
+_ALIGN = 64
+
+
+def save_pst(tree, path):
+    """
+    Write an ArrayPST to path in a versioned binary layout.
+    Layout: header (magic, version, number of arrays, number of nodes), one
+    (name, dtype, offset) entry per array, then each array as raw
+    little-endian data starting at a 64-byte aligned offset so it can be
+    memory-mapped. Besides the node arrays, ids is stored as "ids" and each
+    payload column as "payload[<name>]" when present.
+    Args:
+        tree: The ArrayPST
+        path: Output file path
+    Raises:
+        ValueError: If a payload column is not a one-dimensional array of
+            plain values or its name does not fit in a section entry.
+    """
+    arrays = []
+    for name, array in tree.sections().items():
+        array = np.asarray(array)
+        if array.ndim != 1 or array.dtype.hasobject:
+            raise ValueError(f"Cannot store {name}: {array.ndim}-d {array.dtype} array")
+        if len(name.encode()) > 64:
+            raise ValueError(f"Section name {name!r} is longer than 64 bytes")
+        arrays.append((name, array.astype(array.dtype.newbyteorder("<"), copy=False)))
+    offset = _HEADER.size + _SECTION.size * len(arrays)
+    sections = []
+    for name, array in arrays:
+        offset = -(-offset // _ALIGN) * _ALIGN
+        sections.append((name.encode(), array.dtype.str.encode(), offset))
+        offset += array.nbytes
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(PST_MAGIC, PST_VERSION, len(arrays), len(tree)))
+        for section in sections:
+            f.write(_SECTION.pack(*section))
+        for (_, array), (_, _, offset) in zip(arrays, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(array.tobytes())
+
+
+def load_pst(path, mmap=True):
+    """
+    Open an ArrayPST written by save_pst.
+    With mmap=True the arrays are read-only np.memmap views of the file, so
+    loading costs a header read and processes opening the same file share
+    the page cache; the search functions work on them directly. Files of
+    version 1, which have no ids or payload, are read too.
+    Args:
+        path: File path
+        mmap: Map the file instead of reading it into memory
+    Returns:
+        An ArrayPST.
+    Raises:
+        ValueError: If the file is not a PST file or has another version.
+    """
+    with open(path, "rb") as f:
+        magic, version, count, n = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != PST_MAGIC:
+            raise ValueError(f"{path} is not a PST file")
+        if version == 1:
+            sections = [
+                (name.encode(), *_SECTION_V1.unpack(f.read(_SECTION_V1.size)))
+                for name in _NODE_ARRAYS[:count]
+            ]
+        elif version == PST_VERSION:
+            sections = [_SECTION.unpack(f.read(_SECTION.size)) for _ in range(count)]
+        else:
+            raise ValueError(f"Unsupported PST file version {version}")
+
+        arrays = {}
+        for name, dtype, offset in sections:
+            name = name.rstrip(b"\0").decode()
+            dtype = np.dtype(dtype.rstrip(b"\0").decode())
+            if n == 0:
+                arrays[name] = np.empty(0, dtype=dtype)
+            elif mmap:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=offset, shape=(n,)
+                )
+            else:
+                f.seek(offset)
+                arrays[name] = np.fromfile(f, dtype=dtype, count=n)
+
+    return ArrayPST.from_sections(arrays)
+
+
+def test_memory():
+    import tracemalloc
+
+    for n in [1000, 100000]:
+        points = generate_points(n, (0, 10**6), (0, 10**6))
+        print(f"Testing with {n} points...")
+
+        tracemalloc.start()
+        root = buildPSTFast(points)
+        node_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del root
+
+        start_time = time.perf_counter()
+        tree = buildArrayPST(points)
+        build_time = time.perf_counter() - start_time
+        tracemalloc.start()
+        small_tree = buildArrayPST(points, dtype=np.int32)
+        build_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"Build ArrayPST time: {build_time:.6f} seconds")
+        print(f"Node tree: {node_bytes / n:.1f} bytes per point")
+        print(f"ArrayPST: {bytes_per_point(tree):.1f} bytes per point")
+        print(
+            f"ArrayPST (int32): {bytes_per_point(small_tree):.1f} bytes per point, "
+            f"build peak {build_peak / n:.1f} bytes per point"
+        )
+
+        x1, x2, y1, y2 = 400000, 600000, 900000, 950000
+        start_time = time.perf_counter()
+        result = ArrayPSTRangeSearch(x1, x2, y1, y2, tree)
+        search_time = time.perf_counter() - start_time
+        print(f"Range search time: {search_time:.6f} seconds, Results: {len(result)}\n")
+
+
+def test_batch():
+    import random
+
+    points = generate_points(100000, (0, 10**6), (0, 10**6))
+    tree = buildArrayPST(points)
+    queries = []
+    for _ in range(10000):
+        x1 = random.randint(0, 10**6 - 10**4)
+        y1 = random.randint(0, 10**6 - 10**4)
+        queries.append((x1, x1 + 10**4, y1, y1 + 10**5))
+    print(f"Testing {len(queries)} queries on {len(points)} points...")
+
+    start_time = time.perf_counter()
+    for x1, x2, y1, y2 in queries:
+        ArrayPSTRangeSearch(x1, x2, y1, y2, tree)
+    loop_time = time.perf_counter() - start_time
+    print(f"Range search loop time: {loop_time:.6f} seconds")
+
+    start_time = time.perf_counter()
+    offsets, indices = PSTRangeSearchBatch(np.array(queries), tree)
+    batch_time = time.perf_counter() - start_time
+    print(f"Range search batch time: {batch_time:.6f} seconds, Results: {len(indices)}")
+
+
+def test_persistence():
+    import os
+    import tempfile
+
+    points = generate_points(1000000, (0, 10**6), (0, 10**6))
+    print(f"Testing with {len(points)} points...")
+
+    start_time = time.perf_counter()
+    tree = buildArrayPST(
+        points,
+        ids=np.arange(len(points)) + 10**9,
+        payload={"weight": np.random.default_rng(0).random(len(points))},
+    )
+    build_time = time.perf_counter() - start_time
+    print(f"Build ArrayPST time: {build_time:.6f} seconds")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "points.pst")
+        save_pst(tree, path)
+        print(f"File size: {os.path.getsize(path)} bytes")
+
+        start_time = time.perf_counter()
+        loaded = load_pst(path)
+        result = ArrayPSTRangeSearch(400000, 600000, 900000, 950000, loaded)
+        first_query_time = time.perf_counter() - start_time
+        print(
+            f"Load + first query time: {first_query_time:.6f} seconds, Results: {len(result)}"
+        )
+        assert np.array_equal(loaded.ids, tree.ids)
+        assert np.array_equal(loaded.payload["weight"], tree.payload["weight"])
+        del loaded
+
+
+def test_layout(n=10_000_000, num_descents=1_000_000):
+    import random
+
+    def descend(tree, probes):
+        # Root-to-leaf walks following the median toward each probe x
+        medians = memoryview(tree.median)
+        left = memoryview(tree.left)
+        right = memoryview(tree.right)
+        for x in probes:
+            i = 0
+            while i >= 0:
+                i = left[i] if x <= medians[i] else right[i]
+
+    points = generate_points(n, (0, 10**9), (0, 10**9))
+    print(f"Testing with {n} points...")
+    start_time = time.perf_counter()
+    bfs = buildArrayPST(points)
+    print(f"BFS build time: {time.perf_counter() - start_time:.6f} seconds")
+    start_time = time.perf_counter()
+    veb = _relabel(bfs, _veb_order(bfs.left, bfs.right))
+    print(f"vEB relayout time: {time.perf_counter() - start_time:.6f} seconds")
+
+    probes = [random.randint(0, 10**9) for _ in range(num_descents)]
+    queries = []
+    for _ in range(num_descents // 100):
+        x1 = random.randint(0, 10**9 - 10**5)
+        queries.append((x1, x1 + 10**5, random.randint(0, 10**9)))
+    for name, tree in [("BFS", bfs), ("vEB", veb)]:
+        start_time = time.perf_counter()
+        descend(tree, probes)
+        descent_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for query in queries:
+            ArrayPSTSearch(*query, tree)
+        search_time = time.perf_counter() - start_time
+        print(
+            f"{name} layout: {descent_time / num_descents * 1e9:.0f} ns per descent, "
+            f"{search_time / len(queries) * 1e6:.1f} us per narrow search"
+        )
+
+
+def test_index_results(n=1_000_000):
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    weights = np.random.default_rng(0).random(n)
+    tree = buildArrayPST(points, ids=np.arange(n) + 10**9, payload={"weight": weights})
+    query = (0, 5 * 10**5, 5 * 10**5, 10**6)
+    print(f"Testing with {n} points...")
+
+    start_time = time.perf_counter()
+    result = ArrayPSTRangeSearch(*query, tree)
+    print(
+        f"Tuple results: {len(result)} points in "
+        f"{time.perf_counter() - start_time:.6f} seconds"
+    )
+
+    start_time = time.perf_counter()
+    rows = ArrayPSTRangeSearchIndices(*query, tree)
+    total = tree.payload["weight"][rows].sum()
+    print(
+        f"Index results: {len(rows)} points, weight {total:.1f}, in "
+        f"{time.perf_counter() - start_time:.6f} seconds"
+    )
+
+    buffer = np.empty(n, dtype=np.int64)
+    start_time = time.perf_counter()
+    rows = ArrayPSTRangeSearchIndices(*query, tree, out=buffer)
+    ids = tree.ids[rows]
+    print(
+        f"Buffer results: {len(ids)} ids in "
+        f"{time.perf_counter() - start_time:.6f} seconds"
+    )
+
+
+if __name__ == "__main__":
+    test_memory()
+    test_batch()
+    test_persistence()
+    test_layout()
+    test_index_results()
@@ -0,0 +1,200 @@
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+from priority_search_tree import _PSTBuilder, generate_points
+
+
+class BucketPST:
+    """
+    Array-backed PST whose small subtrees are replaced by leaf buckets.
+    Nodes are stored like ArrayPST. A subtree of at most leaf_size points is
+    kept instead as a bucket: a contiguous, x-sorted slice of bucket_x,
+    bucket_y and bucket_index (bucket b spans bucket_offsets[b] to
+    bucket_offsets[b + 1]), scanned with one vectorized mask. A child (or
+    root) reference r >= 0 is a node, r == -1 is empty and r <= -2 is
+    bucket -r - 2; bucket_max_y lets a whole bucket be skipped on y.
+    """
+
+    def __init__(self, leaf_size, root, nodes, buckets):
+        self.leaf_size = leaf_size
+        self.root = root
+        self.x, self.y, self.median, self.left, self.right, self.index = nodes
+        (
+            self.bucket_offsets,
+            self.bucket_x,
+            self.bucket_y,
+            self.bucket_index,
+            self.bucket_max_y,
+        ) = buckets
+
+
+def buildBucketPST(points, leaf_size=256, dtype=None):
+    """
+    Build a BucketPST: the PST of buildPST with every subtree of at most
+    leaf_size points stored as a bucket.
+    Args:
+        points: List of points (x, y), in any order
+        leaf_size: Maximum number of points per bucket (B)
+        dtype: NumPy dtype for the coordinates (inferred from the points if None)
+    Returns:
+        A BucketPST.
+    """
+    coords = np.array(points, dtype=dtype).reshape(-1, 2)
+    order = np.argsort(coords[:, 0], kind="stable")
+    xs = coords[order, 0]
+    ys = coords[order, 1]
+    builder = _PSTBuilder(memoryview(xs), memoryview(ys))
+
+    pos = []
+    medians = []
+    left = []
+    right = []
+    bucket_positions = []
+    offsets = [0]
+
+    def add(lo, hi, m):
+        # Returns the reference to a new node or bucket for [lo, hi)
+        if m <= leaf_size:
+            bucket_positions.extend(builder.remaining(lo, hi))
+            offsets.append(len(bucket_positions))
+            return -len(offsets)
+        p, median, split, m_left, m_right = builder.take(lo, hi, m)
+        pos.append(p)
+        medians.append(median)
+        left.append(-1)
+        right.append(-1)
+        node = len(pos) - 1
+        queue.append((lo, split, m_left, node, False))
+        queue.append((split, hi, m_right, node, True))
+        return node
+
+    queue = deque()
+    root = add(0, len(xs), len(xs)) if len(xs) else -1
+    while queue:
+        lo, hi, m, parent, is_right = queue.popleft()
+        if not m:
+            continue
+        ref = add(lo, hi, m)
+        if is_right:
+            right[parent] = ref
+        else:
+            left[parent] = ref
+
+    index_dtype = np.int32 if len(points) < 2**31 else np.int64
+    pos = np.array(pos, dtype=np.int64)
+    nodes = (
+        xs[pos],
+        ys[pos],
+        np.array(medians, dtype=coords.dtype),
+        np.array(left, dtype=index_dtype),
+        np.array(right, dtype=index_dtype),
+        order[pos].astype(index_dtype),
+    )
+    bucket_positions = np.array(bucket_positions, dtype=np.int64)
+    offsets = np.array(offsets, dtype=np.int64)
+    bucket_y = ys[bucket_positions]
+    buckets = (
+        offsets,
+        xs[bucket_positions],
+        bucket_y,
+        order[bucket_positions].astype(index_dtype),
+        np.array(
+            [bucket_y[a:b].max() for a, b in zip(offsets[:-1], offsets[1:])],
+            dtype=coords.dtype,
+        ),
+    )
+    return BucketPST(leaf_size, root, nodes, buckets)
+
+
+def _bucket_search(x1, x2, y1, y2, tree):
+    result = []
+    if tree.root == -1:
+        return result
+    xs = memoryview(tree.x)
+    ys = memoryview(tree.y)
+    medians = memoryview(tree.median)
+    left = memoryview(tree.left)
+    right = memoryview(tree.right)
+    offsets = memoryview(tree.bucket_offsets)
+    max_y = memoryview(tree.bucket_max_y)
+    bucket_x = tree.bucket_x
+    bucket_y = tree.bucket_y
+
+    stack = [tree.root]
+    while stack:
+        i = stack.pop()
+        if i < -1:
+            b = -i - 2
+            if max_y[b] < y1:
+                continue
+            start = offsets[b]
+            end = offsets[b + 1]
+            # Buckets are sorted by x, so the x-range is a sub-slice
+            lo = start + int(np.searchsorted(bucket_x[start:end], x1, "left"))
+            hi = start + int(np.searchsorted(bucket_x[start:end], x2, "right"))
+            if lo < hi:
+                bx = bucket_x[lo:hi]
+                by = bucket_y[lo:hi]
+                mask = (by >= y1) & (by <= y2)
+                result.extend(zip(bx[mask].tolist(), by[mask].tolist()))
+            continue
+        y = ys[i]
+        if y < y1:
+            continue
+        x = xs[i]
+        if x1 <= x <= x2 and y <= y2:
+            result.append((x, y))
+        median = medians[i]
+        if x2 > median and right[i] != -1:
+            stack.append(right[i])
+        if x1 <= median and left[i] != -1:
+            stack.append(left[i])
+    return result
+
+
+def BucketPSTSearch(x1, x2, y1, tree):
+    """
+    Three-sided search x1 <= x <= x2, y >= y1 on a BucketPST.
+    Returns:
+        A list of points (x, y).
+    """
+    return _bucket_search(x1, x2, y1, float("inf"), tree)
+
+
+def BucketPSTRangeSearch(x1, x2, y1, y2, tree):
+    """
+    Four-sided search x1 <= x <= x2, y1 <= y <= y2 on a BucketPST.
+    Returns:
+        A list of points (x, y).
+    """
+    return _bucket_search(x1, x2, y1, y2, tree)
+
+
+def test_leaf_size(n=200000, leaf_sizes=(1, 16, 64, 256, 1024, 4096)):
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    queries = []
+    for side in [10**3, 10**4, 10**5]:
+        for _ in range(200):
+            x1 = random.randint(0, 10**6 - side)
+            y1 = random.randint(0, 10**6 - side)
+            queries.append((x1, x1 + side, y1, y1 + side))
+    print(f"Testing {len(queries)} queries on {n} points...")
+
+    best = None
+    for leaf_size in leaf_sizes:
+        tree = buildBucketPST(points, leaf_size=leaf_size)
+        start_time = time.perf_counter()
+        for x1, x2, y1, y2 in queries:
+            BucketPSTRangeSearch(x1, x2, y1, y2, tree)
+        query_time = time.perf_counter() - start_time
+        print(f"B = {leaf_size}: {query_time:.6f} seconds")
+        if best is None or query_time < best[1]:
+            best = (leaf_size, query_time)
+    print(f"Best B for this query mix: {best[0]}")
+
+
+if __name__ == "__main__":
+    test_leaf_size()
@@ -0,0 +1,249 @@
+import random
+import time
+
+from priority_search_tree import buildPSTFast, generate_points
+
+
+class DynamicNode:
+    """
+    Node of a DynamicPST.
+    Every point has a leaf keyed by (x, sequence number); internal nodes route
+    with key = the largest key of their left subtree. Each node also has one
+    slot, item, holding a (key, point) pair from its own subtree, or None.
+    """
+
+    def __init__(self, key, priority):
+        self.key = key
+        self.priority = priority
+        self.item = None
+        self.left = None
+        self.right = None
+
+
+class DynamicPST:
+    """
+    Priority Search Tree supporting insert and delete in O(log n) expected time.
+    The routing structure is a leaf-oriented treap on x (random priorities keep
+    it balanced), and points are kept in the node slots as in McCreight's
+    priority search tree:
+        - a point is stored on the path from the root to its own leaf,
+        - slots are heap-ordered on y,
+        - an empty slot means the whole subtree below it is empty.
+    Three- and four-sided searches therefore prune exactly like PSTSearch.
+    """
+
+    def __init__(self, points=()):
+        self.root = None
+        self.size = 0
+        self._seq = 0
+        self._keys = {}
+        for point in points:
+            self.insert(point)
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, point):
+        key = (point[0], self._seq)
+        self._seq += 1
+        self._keys.setdefault(point, []).append(key)
+        self.size += 1
+
+        leaf = DynamicNode(key, -1.0)
+        if self.root is None:
+            leaf.item = (key, point)
+            self.root = leaf
+            return
+
+        # Find the leaf the new key splits and remember the path to it
+        path = []
+        node = self.root
+        while node.left is not None:
+            path.append(node)
+            node = node.left if key <= node.key else node.right
+
+        internal = DynamicNode(min(key, node.key), random.random())
+        if key <= node.key:
+            internal.left, internal.right = leaf, node
+        else:
+            internal.left, internal.right = node, leaf
+        # The old leaf may hold its own point; lift it so no slot above a
+        # non-empty slot is left empty
+        internal.item, node.item = node.item, None
+        self._replace(path[-1] if path else None, node, internal)
+
+        # Rotate the new internal node up to restore the treap priorities
+        while path and path[-1].priority < internal.priority:
+            parent = path.pop()
+            self._rotate_up(path[-1] if path else None, parent, internal)
+
+        self._sift_in(self.root, (key, point))
+
+    def delete(self, point):
+        """
+        Delete one occurrence of point.
+        Raises:
+            KeyError: If the point is not in the tree.
+        """
+        keys = self._keys.get(point)
+        if not keys:
+            raise KeyError(point)
+        key = keys.pop()
+        if not keys:
+            del self._keys[point]
+        self.size -= 1
+
+        # Empty the slot holding the point and refill it from below
+        node = self.root
+        while node.item[0] != key:
+            node = node.left if key <= node.key else node.right
+        node.item = None
+        self._pull_up(node)
+
+        # Unlink the leaf and its parent, keeping the parent's point
+        path = []
+        node = self.root
+        while node.left is not None:
+            path.append(node)
+            node = node.left if key <= node.key else node.right
+        if not path:
+            self.root = None
+            return
+        parent = path.pop()
+        sibling = parent.right if parent.left is node else parent.left
+        self._replace(path[-1] if path else None, parent, sibling)
+        if parent.item is not None:
+            self._sift_in(sibling, parent.item)
+
+    def _replace(self, parent, old, new):
+        if parent is None:
+            self.root = new
+        elif parent.left is old:
+            parent.left = new
+        else:
+            parent.right = new
+
+    def _rotate_up(self, grandparent, parent, child):
+        if parent.left is child:
+            parent.left = child.right
+            child.right = parent
+        else:
+            parent.right = child.left
+            child.left = parent
+        self._replace(grandparent, parent, child)
+
+        # Both slots may now break the path or heap invariants: empty them,
+        # refill from below and put the two points back in from the top
+        items = [parent.item, child.item]
+        parent.item = child.item = None
+        self._pull_up(parent)
+        self._pull_up(child)
+        for item in items:
+            if item is not None:
+                self._sift_in(child, item)
+
+    def _pull_up(self, node):
+        # Fill an empty slot with the higher child slot, then refill that child
+        while node.left is not None:
+            left = node.left.item
+            right = node.right.item
+            if left is None and right is None:
+                return
+            if right is None or (left is not None and left[1][1] >= right[1][1]):
+                child = node.left
+            else:
+                child = node.right
+            node.item, child.item = child.item, None
+            node = child
+
+    def _sift_in(self, node, item):
+        # Walk towards the item's leaf, swapping it with any lower point met
+        while node.item is not None:
+            if item[1][1] > node.item[1][1]:
+                node.item, item = item, node.item
+            node = node.left if item[0] <= node.key else node.right
+        node.item = item
+
+
+def DynamicPSTSearch(x1, x2, y1, tree):
+    """
+    Three-sided search x1 <= x <= x2, y >= y1 on a DynamicPST.
+    Returns:
+        A list of points (x, y), like PSTSearch.
+    """
+    result = []
+    stack = [tree.root]
+    while stack:
+        node = stack.pop()
+        if node is None or node.item is None:
+            continue
+        point = node.item[1]
+        if point[1] < y1:
+            continue
+        if x1 <= point[0] <= x2:
+            result.append(point)
+        if node.left is not None:
+            if x2 >= node.key[0]:
+                stack.append(node.right)
+            if x1 <= node.key[0]:
+                stack.append(node.left)
+    return result
+
+
+def DynamicPSTRangeSearch(x1, x2, y1, y2, tree):
+    """
+    Four-sided search x1 <= x <= x2, y1 <= y <= y2 on a DynamicPST.
+    Returns:
+        A list of points (x, y).
+    """
+    result = []
+    stack = [tree.root]
+    while stack:
+        node = stack.pop()
+        if node is None or node.item is None:
+            continue
+        point = node.item[1]
+        if point[1] < y1:
+            continue
+        if x1 <= point[0] <= x2 and point[1] <= y2:
+            result.append(point)
+        if node.left is not None:
+            if x2 >= node.key[0]:
+                stack.append(node.right)
+            if x1 <= node.key[0]:
+                stack.append(node.left)
+    return result
+
+
+def test_update_throughput():
+    for n in [10000, 100000]:
+        points = generate_points(n, (0, 10**6), (0, 10**6))
+        updates = generate_points(5000, (0, 10**6), (0, 10**6))
+        print(f"Testing with {n} points...")
+
+        start_time = time.perf_counter()
+        tree = DynamicPST(points)
+        build_time = time.perf_counter() - start_time
+        print(f"Build DynamicPST by inserts time: {build_time:.6f} seconds")
+
+        start_time = time.perf_counter()
+        for point in updates:
+            tree.insert(point)
+        insert_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for point in updates:
+            tree.delete(point)
+        delete_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        buildPSTFast(points)
+        rebuild_time = time.perf_counter() - start_time
+
+        print(f"Inserts: {len(updates) / insert_time:.0f} per second")
+        print(f"Deletes: {len(updates) / delete_time:.0f} per second")
+        print(f"Full rebuild (buildPSTFast): {1 / rebuild_time:.2f} per second\n")
+
+
+if __name__ == "__main__":
+    test_update_throughput()
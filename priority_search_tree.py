@@ -1,8 +1,21 @@
+import array
+import bisect
+import heapq
+import itertools
+import math
 import random
 import time
+from collections import OrderedDict
 
 
 class Node:
+    # Tombstones (see TombstonePST): a dead node is never reported but keeps
+    # its point, so searches still prune on it
+    dead = False
+    dead_count = 0
+    # Weight of the point for PSTSum (see augmentPST)
+    weight = 1
+
     def __init__(self, median=None, point=None):
         self.point = point
         self.left = None
@@ -44,6 +57,281 @@ def buildPST(points):
     return root
 
 
+class _PSTBuilder:
+    """
+    Shared state for building a PST over points presorted by x.
+    A segment tree over the sorted positions keeps, for every segment, the
+    position of its highest remaining point and the number of remaining points,
+    so each node is produced in O(log n) without copying or rescanning lists.
+    The segment tree is kept in typed arrays, a machine word per slot, since
+    a list would also hold an int object for every position.
+    Args:
+        xs: x-coordinates sorted ascending (a list, or a memoryview of an array)
+        ys: y-coordinates in the same order as xs
+    """
+
+    def __init__(self, xs, ys):
+        self.xs = xs
+        self.ys = ys
+        n = len(xs)
+        size = 1
+        while size < n:
+            size *= 2
+        self.size = size
+
+        typecode = "i" if 2 * size < 2**31 else "q"
+        best = array.array(typecode, [-1]) * (2 * size)
+        count = array.array(typecode, [0]) * (2 * size)
+        best[size : size + n] = array.array(typecode, range(n))
+        count[size : size + n] = array.array(typecode, [1]) * n
+        for v in range(size - 1, 0, -1):
+            a = best[2 * v]
+            b = best[2 * v + 1]
+            # Ties go to the smaller position, like max() over the x-sorted list
+            best[v] = a if b < 0 or (a >= 0 and ys[a] >= ys[b]) else b
+            count[v] = count[2 * v] + count[2 * v + 1]
+        self.best = best
+        self.count = count
+
+    def _argmax(self, lo, hi):
+        ys = self.ys
+        best = self.best
+        left_best = -1
+        right_best = -1
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                b = best[lo]
+                if b >= 0 and (left_best < 0 or ys[b] > ys[left_best]):
+                    left_best = b
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                b = best[hi]
+                if b >= 0 and (right_best < 0 or ys[b] >= ys[right_best]):
+                    right_best = b
+            lo >>= 1
+            hi >>= 1
+        if right_best >= 0 and (left_best < 0 or ys[right_best] > ys[left_best]):
+            return right_best
+        return left_best
+
+    def _prefix_count(self, pos):
+        # Number of remaining points at positions < pos
+        count = self.count
+        total = 0
+        lo = self.size
+        hi = pos + self.size
+        while lo < hi:
+            if lo & 1:
+                total += count[lo]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                total += count[hi]
+            lo >>= 1
+            hi >>= 1
+        return total
+
+    def _select(self, rank):
+        # Position of the remaining point with the given global rank
+        count = self.count
+        v = 1
+        while v < self.size:
+            v *= 2
+            if count[v] <= rank:
+                rank -= count[v]
+                v += 1
+        return v - self.size
+
+    def _remove(self, pos):
+        ys = self.ys
+        best = self.best
+        count = self.count
+        v = pos + self.size
+        best[v] = -1
+        count[v] = 0
+        v >>= 1
+        # Only segments whose best was pos change; above them just the counts
+        while v and best[v] == pos:
+            a = best[2 * v]
+            b = best[2 * v + 1]
+            best[v] = a if b < 0 or (a >= 0 and ys[a] >= ys[b]) else b
+            count[v] -= 1
+            v >>= 1
+        while v:
+            count[v] -= 1
+            v >>= 1
+
+    def remaining(self, lo, hi):
+        """Sorted positions in [lo, hi) that have not been taken yet."""
+        count = self.count
+        size = self.size
+        return [i for i in range(lo, hi) if count[size + i]]
+
+    def take(self, lo, hi, m):
+        """
+        Produce the node for the m remaining points at positions [lo, hi).
+        Returns:
+            (position of the node point, median, split, left count, right count)
+            where the left subtree covers [lo, split) and the right [split, hi).
+        """
+        xs = self.xs
+        ys = self.ys
+        p = self._argmax(lo, hi)
+        # Points before lo are not touched here, so this stays valid after
+        # p is removed
+        base = self._prefix_count(lo)
+
+        median = 0
+        if m == 2:
+            a = self._select(base)
+            b = self._select(base + 1)
+            min_y_pos = a if ys[a] <= ys[b] else b
+            median = (xs[p] + xs[min_y_pos]) // 2
+
+        self._remove(p)
+
+        mid = (m - 1) // 2
+        if mid >= 1:
+            a = self._select(base + mid - 1)
+            b = self._select(base + mid)
+            median = (xs[a] + xs[b]) // 2
+
+        split = bisect.bisect_right(xs, median, lo, hi)
+        m_left = self._prefix_count(split) - base
+        return p, median, split, m_left, m - 1 - m_left
+
+
+def buildPSTFast(points):
+    """
+    Build the same Priority Search Tree as buildPST in O(n log n) time.
+    The points are sorted by x once and never copied, rescanned or mutated
+    afterwards, and the tree is built with an explicit stack so that heavily
+    duplicated x-coordinates cannot hit the recursion limit.
+    Args:
+        points: List of points (x, y), in any order
+    Returns:
+        The root Node of the PST.
+    """
+    if not points:
+        return None
+
+    ordered = sorted(points, key=lambda p: p[0])
+    xs = [p[0] for p in ordered]
+    ys = [p[1] for p in ordered]
+    builder = _PSTBuilder(xs, ys)
+
+    root = None
+    stack = [(0, len(ordered), len(ordered), None, False)]
+    while stack:
+        lo, hi, m, parent, is_right = stack.pop()
+        p, median, split, m_left, m_right = builder.take(lo, hi, m)
+        node = Node(median=median, point=ordered[p])
+
+        if parent is None:
+            root = node
+        elif is_right:
+            parent.right = node
+        else:
+            parent.left = node
+
+        if m_right:
+            stack.append((split, hi, m_right, node, True))
+        if m_left:
+            stack.append((lo, split, m_left, node, False))
+
+    return root
+
+
+class _LazyPSTBuilder(_PSTBuilder):
+    """
+    _PSTBuilder that creates LazyNodes one at a time on request.
+    Subtrees cover disjoint position ranges, so take() gives the same node
+    whatever order the subtrees are materialized in.
+    """
+
+    def __init__(self, ordered):
+        super().__init__([p[0] for p in ordered], [p[1] for p in ordered])
+        self.ordered = ordered
+        self.built = 0
+
+    def node(self, lo, hi, m):
+        p, median, split, m_left, m_right = self.take(lo, hi, m)
+        self.built += 1
+        node = LazyNode(median=median, point=self.ordered[p])
+        node._builder = self
+        if m_left:
+            node._left = (lo, split, m_left)
+        if m_right:
+            node._right = (split, hi, m_right)
+        return node
+
+
+class LazyNode(Node):
+    """
+    PST node whose children are built the first time they are read.
+    An unbuilt child is stored as its (lo, hi, count) position range and
+    turned into a LazyNode by the shared builder on access, so every search
+    written against Node works on a lazy tree unchanged.
+    """
+
+    _builder = None
+
+    @property
+    def left(self):
+        child = self._left
+        if type(child) is tuple:
+            child = self._left = self._builder.node(*child)
+        return child
+
+    @left.setter
+    def left(self, value):
+        self._left = value
+
+    @property
+    def right(self):
+        child = self._right
+        if type(child) is tuple:
+            child = self._right = self._builder.node(*child)
+        return child
+
+    @right.setter
+    def right(self, value):
+        self._right = value
+
+
+def buildPSTLazy(points, eager_depth=8):
+    """
+    Build the same Priority Search Tree as buildPST, materializing lazily.
+    Only the top eager_depth levels are built up front; every deeper node is
+    built the first time a search descends into it. Queries confined to a
+    narrow x-window therefore only pay for the nodes on their paths.
+    Args:
+        points: List of points (x, y), in any order
+        eager_depth: Number of levels built before returning
+    Returns:
+        The root LazyNode of the PST.
+    """
+    if not points:
+        return None
+
+    ordered = sorted(points, key=lambda p: p[0])
+    builder = _LazyPSTBuilder(ordered)
+    root = builder.node(0, len(ordered), len(ordered))
+
+    level = [root]
+    for _ in range(eager_depth - 1):
+        level = [
+            child
+            for node in level
+            for child in (node.left, node.right)
+            if child is not None
+        ]
+    return root
+
+
 def PSTSearch(x1, x2, y1, node):
     if node is None:
         return []
@@ -52,7 +340,7 @@ def PSTSearch(x1, x2, y1, node):
         return []
 
     result = []
-    if x1 <= node.point[0] <= x2:
+    if x1 <= node.point[0] <= x2 and not node.dead:
         result.append(node.point)
 
     if x1 <= node.median:
@@ -69,7 +357,7 @@ def PSTSearchLeft(x1, y1, y2, node):
 
     result = []
     # Check condition y1 <= y <= y2
-    if y1 <= node.point[1] <= y2:
+    if y1 <= node.point[1] <= y2 and not node.dead:
         # Check condition x >= x1
         if node.point[0] >= x1:
             result.append(node.point)
@@ -90,7 +378,7 @@ def PSTSearchRight(x2, y1, y2, node):
 
     result = []
     # Check condition y1 <= y <= y2
-    if y1 <= node.point[1] <= y2:
+    if y1 <= node.point[1] <= y2 and not node.dead:
         # Check condition x <= x2
         if node.point[0] <= x2:
             result.append(node.point)
@@ -124,7 +412,7 @@ def PSTRangeSearch(x1, x2, y1, y2, node):
     result = []
     if x1 <= node.point[0] and node.point[0] <= x2:
         # If the y-coordinate of the point at the node is outside the range [y1, y2], exclude this node
-        if y1 <= node.point[1] and node.point[1] <= y2:
+        if y1 <= node.point[1] and node.point[1] <= y2 and not node.dead:
             result.append(node.point)
         if node.left.point[0] < x2:
             result.extend(PSTSearchLeft(x1, y1, y2, node.left))
@@ -138,6 +426,721 @@ def PSTRangeSearch(x1, x2, y1, y2, node):
     return result
 
 
+class PSTSearchStats:
+    """
+    Optional traversal statistics for the iterative PST searches.
+    Pass an instance as stats= to record, for every query, the nodes visited,
+    the subtrees cut off by the y test and by the median test, and the points
+    reported, and the tombstoned nodes passed over. Without stats the
+    searches run their uninstrumented loops.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def record(self, visited, pruned_y, pruned_median, reported, dead=0):
+        self.queries.append((visited, pruned_y, pruned_median, reported, dead))
+
+    def totals(self):
+        visited = sum(q[0] for q in self.queries)
+        pruned_y = sum(q[1] for q in self.queries)
+        pruned_median = sum(q[2] for q in self.queries)
+        reported = sum(q[3] for q in self.queries)
+        dead = sum(q[4] for q in self.queries)
+        return {
+            "queries": len(self.queries),
+            "visited": visited,
+            "pruned_y": pruned_y,
+            "pruned_median": pruned_median,
+            "reported": reported,
+            "dead": dead,
+        }
+
+    def visit_ratios(self, n):
+        """visited / (log2 n + k) for each query on a tree of n points."""
+        log_n = math.log2(max(n, 2))
+        return [q[0] / (log_n + q[3]) for q in self.queries]
+
+
+def _search_with_stats(x1, x2, y1, y2, node, out, stats):
+    # Shared instrumented traversal: the one- and three-sided searches are
+    # four-sided searches with infinite bounds
+    visited = pruned_y = pruned_median = reported = dead = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        visited += 1
+        point = node.point
+        if point[1] < y1:
+            pruned_y += 1
+            continue
+        if node.dead:
+            dead += 1
+        if x1 <= point[0] <= x2 and point[1] <= y2 and not node.dead:
+            out.append(point)
+            reported += 1
+        if x2 > node.median:
+            stack.append(node.right)
+        elif node.right is not None:
+            pruned_median += 1
+        if x1 <= node.median:
+            stack.append(node.left)
+        elif node.left is not None:
+            pruned_median += 1
+    stats.record(visited, pruned_y, pruned_median, reported, dead)
+    return out
+
+
+def PSTSearchIterative(x1, x2, y1, node, out=None, stats=None):
+    """
+    Non-recursive PSTSearch that appends into a single output list.
+    Visits nodes in the same order as PSTSearch, so each reported point is
+    appended exactly once instead of being copied up through every level.
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        y1: Lower bound for y-coordinate
+        node: The root of the PST
+        out: Optional list to append the points to
+        stats: Optional PSTSearchStats to record the traversal in
+    Returns:
+        The output list.
+    """
+    if out is None:
+        out = []
+    if stats is not None:
+        return _search_with_stats(x1, x2, y1, math.inf, node, out, stats)
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if x1 <= point[0] <= x2 and not node.dead:
+            out.append(point)
+        if x2 > node.median:
+            stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+    return out
+
+
+def PSTSearchLeftIterative(x1, y1, y2, node, out=None, stats=None):
+    """
+    Non-recursive PSTSearchLeft: points with x >= x1 and y1 <= y <= y2.
+    Subtrees whose top point is below y1 are skipped (heap order).
+    """
+    if out is None:
+        out = []
+    if stats is not None:
+        return _search_with_stats(x1, math.inf, y1, y2, node, out, stats)
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if point[1] <= y2 and point[0] >= x1 and not node.dead:
+            out.append(point)
+        stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+    return out
+
+
+def PSTSearchRightIterative(x2, y1, y2, node, out=None, stats=None):
+    """
+    Non-recursive PSTSearchRight: points with x <= x2 and y1 <= y <= y2.
+    Subtrees whose top point is below y1 are skipped (heap order).
+    """
+    if out is None:
+        out = []
+    if stats is not None:
+        return _search_with_stats(-math.inf, x2, y1, y2, node, out, stats)
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if point[1] <= y2 and point[0] <= x2 and not node.dead:
+            out.append(point)
+        if x2 > node.median:
+            stack.append(node.right)
+        stack.append(node.left)
+    return out
+
+
+def PSTRangeSearchIterative(x1, x2, y1, y2, node, out=None, stats=None):
+    """
+    Non-recursive four-sided search x1 <= x <= x2, y1 <= y <= y2.
+    Prunes on y1 (heap order) and on the medians, like PSTRangeSearchModify
+    in compare_algorithm.py, and reports exactly the points in the rectangle.
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        y1: Lower bound for y-coordinate
+        y2: Upper bound for y-coordinate
+        node: The root of the PST
+        out: Optional list to append the points to
+        stats: Optional PSTSearchStats to record the traversal in
+    Returns:
+        The output list.
+    """
+    if out is None:
+        out = []
+    if stats is not None:
+        return _search_with_stats(x1, x2, y1, y2, node, out, stats)
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if x1 <= point[0] <= x2 and point[1] <= y2 and not node.dead:
+            out.append(point)
+        if x2 > node.median:
+            stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+    return out
+
+
+def PSTSearchGen(x1, x2, y1, node):
+    """Yield the points of PSTSearchIterative as they are found."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if x1 <= point[0] <= x2 and not node.dead:
+            yield point
+        if x2 > node.median:
+            stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+
+
+def PSTSearchLeftGen(x1, y1, y2, node):
+    """Yield the points of PSTSearchLeftIterative as they are found."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if point[1] <= y2 and point[0] >= x1 and not node.dead:
+            yield point
+        stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+
+
+def PSTSearchRightGen(x2, y1, y2, node):
+    """Yield the points of PSTSearchRightIterative as they are found."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if point[1] <= y2 and point[0] <= x2 and not node.dead:
+            yield point
+        if x2 > node.median:
+            stack.append(node.right)
+        stack.append(node.left)
+
+
+def PSTRangeSearchGen(x1, x2, y1, y2, node):
+    """Yield the points of PSTRangeSearchIterative as they are found."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if x1 <= point[0] <= x2 and point[1] <= y2 and not node.dead:
+            yield point
+        if x2 > node.median:
+            stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+
+
+def _aggregate(node):
+    # Recompute the aggregates of node from its own point and its children
+    x, y = node.point
+    size = 1
+    min_x = max_x = x
+    min_y = y
+    dead = 1 if node.dead else 0
+    sum_weight = 0 if node.dead else node.weight
+    for child in (node.left, node.right):
+        if child is not None:
+            size += child.size
+            min_x = min(min_x, child.min_x)
+            max_x = max(max_x, child.max_x)
+            min_y = min(min_y, child.min_y)
+            dead += child.dead_count
+            sum_weight += child.sum_weight
+    node.size = size
+    node.min_x = min_x
+    node.max_x = max_x
+    node.min_y = min_y
+    node.sum_weight = sum_weight
+    if dead or node.dead_count:
+        node.dead_count = dead
+
+
+def augmentPST(root, weight=None):
+    """
+    Store subtree aggregates on every node of a PST for the count and
+    aggregate queries: size (number of points), min_x, max_x and min_y of the
+    subtree, and sum_weight, the total weight of its live points.
+    The maximum y of a subtree is its top point (heap order).
+    Args:
+        root: The root of the PST
+        weight: Optional function giving the weight of a point (1 if None)
+    Returns:
+        The same root.
+    """
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is not None:
+            order.append(node)
+            stack.append(node.left)
+            stack.append(node.right)
+
+    # Children come after their parent in order, so walk it backwards
+    for node in reversed(order):
+        if weight is not None:
+            node.weight = weight(node.point)
+        _aggregate(node)
+    return root
+
+
+def PSTCount(x1, x2, y1, node):
+    """
+    Count the points with x1 <= x <= x2 and y >= y1 without listing them.
+    Subtrees that lie entirely inside the query are counted in O(1) from
+    their size, so wide queries only visit the nodes along the boundary.
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        y1: Lower bound for y-coordinate
+        node: The root of a PST augmented with augmentPST
+    Returns:
+        The number of matching points.
+    """
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if x1 <= node.min_x and node.max_x <= x2 and y1 <= node.min_y:
+            count += node.size - node.dead_count
+            continue
+        if x1 <= point[0] <= x2 and not node.dead:
+            count += 1
+        if x2 > node.median:
+            stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+    return count
+
+
+def PSTRangeCount(x1, x2, y1, y2, node):
+    """
+    Count the points with x1 <= x <= x2 and y1 <= y <= y2 without listing them.
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        y1: Lower bound for y-coordinate
+        y2: Upper bound for y-coordinate
+        node: The root of a PST augmented with augmentPST
+    Returns:
+        The number of matching points.
+    """
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1 or node.min_y > y2:
+            continue
+        if (
+            x1 <= node.min_x
+            and node.max_x <= x2
+            and y1 <= node.min_y
+            and point[1] <= y2
+        ):
+            count += node.size - node.dead_count
+            continue
+        if x1 <= point[0] <= x2 and point[1] <= y2 and not node.dead:
+            count += 1
+        if x2 > node.median:
+            stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+    return count
+
+
+def PSTMax(x1, x2, node):
+    """
+    Highest point with x1 <= x <= x2, in O(log n).
+    A node whose point lies in the x-range is the highest point of its
+    subtree (heap order), so the search stops there; it only descends
+    through the nodes whose subtree straddles x1 or x2.
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        node: The root of a PST augmented with augmentPST
+    Returns:
+        The point (x, y), or None if no point lies in the range.
+    """
+    best = None
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if best is not None and point[1] <= best[1]:
+            continue
+        if node.max_x < x1 or x2 < node.min_x:
+            continue
+        if x1 <= point[0] <= x2 and not node.dead:
+            best = point
+            continue
+        stack.append(node.right)
+        stack.append(node.left)
+    return best
+
+
+def PSTMinY(x1, x2, node):
+    """
+    Lowest y-coordinate among the points with x1 <= x <= x2, in O(log n).
+    Subtrees inside the x-range answer from their min_y in O(1).
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        node: The root of a PST augmented with augmentPST
+    Returns:
+        The minimum y, or None if no point lies in the range.
+    """
+    best = None
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if best is not None and node.min_y >= best:
+            continue
+        if node.max_x < x1 or x2 < node.min_x:
+            continue
+        if x1 <= node.min_x and node.max_x <= x2 and not node.dead_count:
+            best = node.min_y
+            continue
+        point = node.point
+        if x1 <= point[0] <= x2 and not node.dead:
+            if best is None or point[1] < best:
+                best = point[1]
+        stack.append(node.right)
+        stack.append(node.left)
+    return best
+
+
+def PSTSum(x1, x2, y1, node):
+    """
+    Total weight of the points with x1 <= x <= x2 and y >= y1.
+    Like PSTCount, subtrees inside the query add their sum_weight in O(1)
+    instead of being enumerated, so sums over an x-range (y1 at or below
+    every point) take O(log n). Subtrees that straddle y1 still have their
+    points above y1 visited, but nothing is copied into a result list.
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        y1: Lower bound for y-coordinate
+        node: The root of a PST augmented with augmentPST
+    Returns:
+        The sum of the weights (the count when the tree has no weights).
+    """
+    total = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point = node.point
+        if point[1] < y1:
+            continue
+        if x1 <= node.min_x and node.max_x <= x2 and y1 <= node.min_y:
+            total += node.sum_weight
+            continue
+        if x1 <= point[0] <= x2 and not node.dead:
+            total += node.weight
+        if x2 > node.median:
+            stack.append(node.right)
+        if x1 <= node.median:
+            stack.append(node.left)
+    return total
+
+
+def PSTTopKIter(x1, x2, node):
+    """
+    Yield the points with x1 <= x <= x2 in decreasing y order, lazily.
+    A priority queue holds the frontier of the heap-ordered tree, so the next
+    highest point is always either popped next or below a popped node.
+    Only nodes whose subtree crosses x1 or x2 are popped without being
+    reported, so producing k points costs O(log n + k log k).
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        node: The root of the PST
+    """
+    if node is None:
+        return
+    # The counter breaks ties between equal y values so nodes are never compared
+    counter = 0
+    heap = [(-node.point[1], counter, node)]
+    while heap:
+        _, _, node = heapq.heappop(heap)
+        point = node.point
+        if x1 <= point[0] <= x2 and not node.dead:
+            yield point
+        for child, follow in (
+            (node.left, x1 <= node.median),
+            (node.right, x2 > node.median),
+        ):
+            if follow and child is not None:
+                counter += 1
+                heapq.heappush(heap, (-child.point[1], counter, child))
+
+
+def PSTTopK(x1, x2, k, node):
+    """
+    Return the k highest points with x1 <= x <= x2, in decreasing y order.
+    Args:
+        x1: Lower bound for x-coordinate
+        x2: Upper bound for x-coordinate
+        k: Number of points wanted
+        node: The root of the PST
+    Returns:
+        A list of at most k points (x, y).
+    """
+    if k <= 0:
+        return []
+    return list(itertools.islice(PSTTopKIter(x1, x2, node), k))
+
+
+class PSTQueryCache:
+    """
+    Opt-in LRU cache in front of the PST searches.
+    Results are stored per query rectangle (x1, x2, y1, y2), with y2 = inf for
+    three-sided searches. A query inside a cached rectangle is answered by
+    filtering that rectangle's points instead of walking the tree, in the
+    same order a search would report them. Memory is bounded by the total
+    number of cached points and by the number of cached rectangles, so empty
+    results count too; least recently used rectangles are evicted first.
+    Only the scan_limit most recently used rectangles are checked for
+    containment, so a miss costs O(scan_limit) on top of the search.
+    Passing a different root (a rebuilt tree) clears the cache; call
+    invalidate() after changing a tree in place.
+    Args:
+        max_points: Maximum number of points kept across all cached results
+        max_entries: Maximum number of cached rectangles
+        scan_limit: Number of recent rectangles checked for containment
+    """
+
+    def __init__(self, max_points=100000, max_entries=1024, scan_limit=16):
+        self.max_points = max_points
+        self.max_entries = max_entries
+        self.scan_limit = scan_limit
+        self.entries = OrderedDict()
+        self.cached_points = 0
+        self.hits = 0
+        self.containment_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._root = None
+
+    def invalidate(self):
+        self.entries.clear()
+        self.cached_points = 0
+
+    def search(self, x1, x2, y1, node):
+        """Cached PSTSearchIterative."""
+        return self._lookup((x1, x2, y1, math.inf), node)
+
+    def range_search(self, x1, x2, y1, y2, node):
+        """Cached PSTRangeSearchIterative."""
+        return self._lookup((x1, x2, y1, y2), node)
+
+    def _lookup(self, rect, node):
+        if node is not self._root:
+            self.invalidate()
+            self._root = node
+
+        result = self.entries.get(rect)
+        if result is not None:
+            self.entries.move_to_end(rect)
+            self.hits += 1
+            return list(result)
+
+        x1, x2, y1, y2 = rect
+        for cached_rect in itertools.islice(reversed(self.entries), self.scan_limit):
+            cx1, cx2, cy1, cy2 = cached_rect
+            if cx1 <= x1 and x2 <= cx2 and cy1 <= y1 and y2 <= cy2:
+                cached = self.entries[cached_rect]
+                self.entries.move_to_end(cached_rect)
+                self.containment_hits += 1
+                return [p for p in cached if x1 <= p[0] <= x2 and y1 <= p[1] <= y2]
+
+        self.misses += 1
+        if y2 == math.inf:
+            result = PSTSearchIterative(x1, x2, y1, node)
+        else:
+            result = PSTRangeSearchIterative(x1, x2, y1, y2, node)
+        if len(result) <= self.max_points:
+            self.entries[rect] = tuple(result)
+            self.cached_points += len(result)
+            while (
+                self.cached_points > self.max_points
+                or len(self.entries) > self.max_entries
+            ):
+                _, evicted = self.entries.popitem(last=False)
+                self.cached_points -= len(evicted)
+                self.evictions += 1
+        return result
+
+
+class TombstonePST:
+    """
+    PST with soft deletes.
+    delete() marks the node holding a point as dead instead of rebuilding:
+    the searches and counts skip dead nodes but still prune on their points,
+    so heap order is kept. Each node on the path counts the dead nodes below
+    it, and once a subtree's dead fraction exceeds `threshold` it is rebuilt
+    from its live points with buildPSTFast, which drops the tombstones.
+    Counters: dead (current tombstones), compactions, compacted_nodes (nodes
+    rebuilt) and compaction_time (seconds). Pass a PSTSearchStats to the
+    searches to see how many dead nodes each query walked over.
+    Args:
+        points: List of points (x, y), in any order
+        threshold: Dead fraction above which a subtree is rebuilt
+        weight: Optional function giving the weight of a point, for PSTSum
+    """
+
+    def __init__(self, points, threshold=0.25, weight=None):
+        self.weight = weight
+        self.root = augmentPST(buildPSTFast(points), weight)
+        self.threshold = threshold
+        self.dead = 0
+        self.compactions = 0
+        self.compacted_nodes = 0
+        self.compaction_time = 0.0
+
+    def __len__(self):
+        if self.root is None:
+            return 0
+        return self.root.size - self.root.dead_count
+
+    def delete(self, point):
+        """
+        Mark one live copy of point as dead.
+        Raises:
+            KeyError: If no live node holds the point.
+        """
+        # Follow the medians toward point's x; heap order means it cannot
+        # sit below a node with a smaller y
+        path = []
+        node = self.root
+        while node is not None and node.point[1] >= point[1]:
+            path.append(node)
+            if node.point == point and not node.dead:
+                break
+            node = node.left if point[0] <= node.median else node.right
+        else:
+            raise KeyError(point)
+
+        node.dead = True
+        self.dead += 1
+        for ancestor in path:
+            ancestor.dead_count += 1
+            ancestor.sum_weight -= node.weight
+        for depth, ancestor in enumerate(path):
+            if ancestor.dead_count > self.threshold * ancestor.size:
+                self._compact(path, depth)
+                break
+
+    def _compact(self, path, depth):
+        start_time = time.perf_counter()
+        node = path[depth]
+        live = []
+        stack = [node]
+        while stack:
+            child = stack.pop()
+            if child is not None:
+                if not child.dead:
+                    live.append(child.point)
+                stack.append(child.left)
+                stack.append(child.right)
+        subtree = augmentPST(buildPSTFast(live), self.weight)
+
+        if depth == 0:
+            self.root = subtree
+        elif path[depth - 1].left is node:
+            path[depth - 1].left = subtree
+        else:
+            path[depth - 1].right = subtree
+        removed = node.dead_count
+        for ancestor in reversed(path[:depth]):
+            _aggregate(ancestor)
+        self.dead -= removed
+
+        self.compactions += 1
+        self.compacted_nodes += node.size
+        self.compaction_time += time.perf_counter() - start_time
+
+    def search(self, x1, x2, y1, stats=None):
+        """Three-sided query, like PSTSearch."""
+        return PSTSearchIterative(x1, x2, y1, self.root, stats=stats)
+
+    def range_search(self, x1, x2, y1, y2, stats=None):
+        """Four-sided query, like PSTRangeSearch."""
+        return PSTRangeSearchIterative(x1, x2, y1, y2, self.root, stats=stats)
+
+    def count(self, x1, x2, y1, y2=math.inf):
+        return PSTRangeCount(x1, x2, y1, y2, self.root)
+
+
 def generate_points(num_points, x_range=(0, 100), y_range=(0, 100)):
     return [
         (random.randint(*x_range), random.randint(*y_range)) for _ in range(num_points)
@@ -260,6 +1263,12 @@ def test_build():
 
         points.sort(key=lambda p: p[0])
 
+        # Fast build time (does not mutate points)
+        start_time = time.perf_counter()
+        buildPSTFast(points)
+        fast_build_time = time.perf_counter() - start_time
+        print(f"Build PST (fast) time: {fast_build_time:.6f} seconds")
+
         # Build time
         start_time = time.perf_counter()
         pst = buildPST(points)
@@ -291,6 +1300,168 @@ def test_build():
     test_and_measure(points_40000)
 
 
+def test_lazy_build(n=200000, num_queries=100, width=1000, eager_depth=8):
+    import tracemalloc
+
+    def materialize(node):
+        # Read every child link so the whole tree is built
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node is not None:
+                stack.append(node.left)
+                stack.append(node.right)
+
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    queries = []
+    for _ in range(num_queries):
+        x1 = random.randint(0, 10**6 - width)
+        queries.append((x1, x1 + width, random.randint(0, 10**6)))
+    print(f"Testing with {n} points, {num_queries} queries of width {width}...")
+
+    for name, build in [
+        ("Eager", buildPSTFast),
+        ("Lazy", lambda points: buildPSTLazy(points, eager_depth)),
+    ]:
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        root = build(points)
+        PSTSearchIterative(*queries[0], root)
+        first_query_time = time.perf_counter() - start_time
+        for query in queries[1:]:
+            PSTSearchIterative(*query, root)
+        queries_time = time.perf_counter() - start_time
+        queries_memory = tracemalloc.get_traced_memory()[0]
+        built = root._builder.built if isinstance(root, LazyNode) else n
+        materialize(root)
+        total_time = time.perf_counter() - start_time
+        total_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print(f"{name} time to first query: {first_query_time:.6f} seconds")
+        print(
+            f"{name} time after {num_queries} queries: {queries_time:.6f} seconds, "
+            f"{queries_memory / 2**20:.1f} MiB"
+        )
+        print(f"{name} nodes built by the queries: {built} of {n}")
+        print(
+            f"{name} time with every node built: {total_time:.6f} seconds, "
+            f"{total_memory / 2**20:.1f} MiB"
+        )
+
+
+def test_tombstones(n=100000, num_queries=1000, threshold=0.25):
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    queries = []
+    for _ in range(num_queries):
+        x1 = random.randint(0, 10**6 - 10**5)
+        y1 = random.randint(0, 10**6 - 10**5)
+        queries.append((x1, x1 + 10**5, y1, y1 + 10**5))
+    print(f"Testing with {n} points, threshold {threshold}...")
+
+    tree = TombstonePST(points, threshold)
+    live = list(points)
+    random.shuffle(live)
+    for fraction in [0.0, 0.1, 0.25, 0.5]:
+        while len(live) > n * (1 - fraction):
+            tree.delete(live.pop())
+
+        start_time = time.perf_counter()
+        for query in queries:
+            tree.range_search(*query)
+        tombstone_time = time.perf_counter() - start_time
+        stats = PSTSearchStats()
+        for query in queries:
+            tree.range_search(*query, stats=stats)
+
+        fresh = augmentPST(buildPSTFast(live))
+        start_time = time.perf_counter()
+        for query in queries:
+            PSTRangeSearchIterative(*query, fresh)
+        fresh_time = time.perf_counter() - start_time
+
+        totals = stats.totals()
+        print(
+            f"Deleted {fraction:.0%}: {tree.dead} tombstones, "
+            f"{totals['dead'] / num_queries:.1f} dead nodes visited per query, "
+            f"query slowdown {tombstone_time / fresh_time:.2f}x"
+        )
+        print(
+            f"Compactions: {tree.compactions}, {tree.compacted_nodes} nodes rebuilt "
+            f"in {tree.compaction_time:.6f} seconds"
+        )
+
+
+def test_query_cache(n=200000, num_queries=2000):
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    root = buildPSTFast(points)
+    print(f"Testing with {n} points...")
+
+    # Empty results take entries too and must be evicted
+    cache = PSTQueryCache(max_points=10, max_entries=100)
+    for i in range(num_queries):
+        assert cache.range_search(i, i, 10**7, 10**7, root) == []
+    assert len(cache.entries) == 100, len(cache.entries)
+    assert cache.evictions == num_queries - 100
+
+    # Misses on a full cache should cost little more than the search
+    queries = []
+    for _ in range(num_queries):
+        x1 = random.randint(0, 10**6 - 10**3)
+        y1 = random.randint(0, 10**6 - 10**3)
+        queries.append((x1, x1 + 10**3, y1, y1 + 10**3))
+    cache = PSTQueryCache()
+    for query in queries:
+        cache.range_search(*query, root)
+    start_time = time.perf_counter()
+    for query in queries:
+        PSTRangeSearchIterative(*query, root)
+    search_time = time.perf_counter() - start_time
+    # Shifted queries are neither cached nor contained in a cached rectangle
+    shifted = [(x1 + 1, x2 + 1, y1, y2) for x1, x2, y1, y2 in queries]
+    start_time = time.perf_counter()
+    for query in shifted:
+        cache.range_search(*query, root)
+    miss_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for query in shifted[-cache.max_entries :]:
+        cache.range_search(*query, root)
+    hit_time = time.perf_counter() - start_time
+    print(
+        f"{len(cache.entries)} entries: search {search_time / num_queries * 1e6:.1f} us, "
+        f"cache miss {miss_time / num_queries * 1e6:.1f} us, "
+        f"cache hit {hit_time / cache.max_entries * 1e6:.1f} us"
+    )
+
+
+def test_aggregates(n=200000, num_queries=200):
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    root = augmentPST(buildPSTFast(points), weight=lambda p: p[1])
+    queries = []
+    for _ in range(num_queries):
+        x1 = random.randint(0, 5 * 10**5)
+        queries.append((x1, x1 + 4 * 10**5, 0))
+    print(f"Testing with {n} points...")
+
+    for name, aggregate, reduce in [
+        ("Max y", lambda q: PSTMax(q[0], q[1], root), lambda r: max(p[1] for p in r)),
+        ("Sum", lambda q: PSTSum(*q, root), lambda r: sum(p[1] for p in r)),
+    ]:
+        start_time = time.perf_counter()
+        for query in queries:
+            aggregate(query)
+        aggregate_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for query in queries:
+            reduce(PSTSearchIterative(*query, root))
+        search_time = time.perf_counter() - start_time
+        print(
+            f"{name}: aggregate {aggregate_time / num_queries * 1e6:.1f} us, "
+            f"search and reduce {search_time / num_queries * 1e6:.1f} us"
+        )
+
+
 def basic_test():
     points = [
         (60, 75),
@@ -319,5 +1490,6 @@ def basic_test():
 
 
 # Call
-# test_build()
-test_search()
+if __name__ == "__main__":
+    # test_build()
+    test_search()
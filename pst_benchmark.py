@@ -0,0 +1,209 @@
+"""
+Reproducible benchmark suite for building and querying Priority Search Trees.
+
+Sweeps the number of points and the query selectivity (the fraction of the
+coordinate square a query covers), times every operation over warmup and
+repeated runs, and writes median/p95/p99 latencies as JSON so results from
+different versions can be compared:
+
+    python pst_benchmark.py --max-n 100000 --output bench.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from array_pst import ArrayPSTRangeSearch, ArrayPSTSearch, buildArrayPST
+from priority_search_tree import (
+    PSTRangeCount,
+    PSTRangeSearchIterative,
+    PSTSearchIterative,
+    augmentPST,
+    buildPSTFast,
+    generate_points,
+)
+from pst_ingest import ingest_throughput
+
+COORD_MAX = 10**6
+SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+SELECTIVITIES = [0.0001, 0.001, 0.01, 0.1, 1.0]
+
+
+def summarize(times):
+    times = np.asarray(times)
+    return {
+        "runs": len(times),
+        "mean_s": float(times.mean()),
+        "median_s": float(np.percentile(times, 50)),
+        "p95_s": float(np.percentile(times, 95)),
+        "p99_s": float(np.percentile(times, 99)),
+    }
+
+
+def make_queries(rng, selectivity, count):
+    """
+    Random (x1, x2, y1, y2) squares covering `selectivity` of the coordinate
+    square. For three-sided use y2 is ignored, and y1 is placed so the open
+    range above it covers the same fraction.
+    """
+    side = int(COORD_MAX * math.sqrt(selectivity))
+    queries = []
+    for _ in range(count):
+        x1 = rng.randint(0, COORD_MAX - side)
+        y1 = rng.randint(0, COORD_MAX - side)
+        queries.append((x1, x1 + side, y1, y1 + side))
+    return queries
+
+
+def time_queries(run, queries, warmup, repeats):
+    """
+    Time run(query) for every query; returns per-query latencies and the
+    average number of results.
+    """
+    for _ in range(warmup):
+        for query in queries:
+            run(query)
+    times = []
+    results = 0
+    for _ in range(repeats):
+        for query in queries:
+            start_time = time.perf_counter()
+            found = run(query)
+            times.append(time.perf_counter() - start_time)
+            results += found if isinstance(found, int) else len(found)
+    return times, results / max(len(times), 1)
+
+
+def bench_size(n, args):
+    rng = random.Random(args.seed + n)
+    random.seed(args.seed + n)
+    points = generate_points(n, (0, COORD_MAX), (0, COORD_MAX))
+    records = []
+
+    def record(backend, operation, times, selectivity=None, avg_results=None):
+        entry = {"backend": backend, "operation": operation, "n": n}
+        if selectivity is not None:
+            entry["selectivity"] = selectivity
+        entry.update(summarize(times))
+        if avg_results is not None:
+            entry["avg_results"] = avg_results
+        records.append(entry)
+        print(
+            f"{backend:>5} {operation:<12} n={n:<9} "
+            f"sel={selectivity if selectivity is not None else '-':<7} "
+            f"median={entry['median_s']:.6f}s p95={entry['p95_s']:.6f}s "
+            f"p99={entry['p99_s']:.6f}s"
+        )
+
+    builders = {"node": buildPSTFast, "array": buildArrayPST}
+    trees = {}
+    for backend, build in builders.items():
+        times = []
+        for _ in range(args.build_repeats):
+            start_time = time.perf_counter()
+            trees[backend] = build(points)
+            times.append(time.perf_counter() - start_time)
+        record(backend, "build", times)
+    augmentPST(trees["node"])
+
+    node = trees["node"]
+    array = trees["array"]
+    operations = [
+        ("node", "three_sided", lambda q: PSTSearchIterative(q[0], q[1], q[2], node)),
+        ("node", "four_sided", lambda q: PSTRangeSearchIterative(*q, node)),
+        ("node", "count", lambda q: PSTRangeCount(*q, node)),
+        ("array", "three_sided", lambda q: ArrayPSTSearch(q[0], q[1], q[2], array)),
+        ("array", "four_sided", lambda q: ArrayPSTRangeSearch(*q, array)),
+    ]
+    for selectivity in args.selectivities:
+        queries = make_queries(rng, selectivity, args.queries)
+        three_sided = [
+            (x1, x2, COORD_MAX - (x2 - x1), y2) for x1, x2, _, y2 in queries
+        ]
+        for backend, operation, run in operations:
+            batch = three_sided if operation == "three_sided" else queries
+            times, avg_results = time_queries(run, batch, args.warmup, args.repeats)
+            record(backend, operation, times, selectivity, avg_results)
+    return records
+
+
+def bench_ingest(n, args):
+    """Points per second streamed from CSV and int32 binary files of n points."""
+    rng = np.random.default_rng(args.seed + n)
+    coords = rng.integers(0, COORD_MAX, size=(n, 2), dtype=np.int32)
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "points.csv")
+        binary_path = os.path.join(directory, "points.bin")
+        np.savetxt(csv_path, coords, fmt="%d", delimiter=",")
+        coords.astype("<i4").tofile(binary_path)
+
+        for fmt, path in [("csv", csv_path), ("binary", binary_path)]:
+            rates = [
+                ingest_throughput(path, fmt)[1] for _ in range(args.build_repeats)
+            ]
+            entry = {
+                "backend": "ingest",
+                "operation": fmt,
+                "n": n,
+                "median_points_per_s": float(np.median(rates)),
+                "runs": len(rates),
+            }
+            records.append(entry)
+            print(
+                f"ingest {fmt:<12} n={n:<9} "
+                f"median={entry['median_points_per_s']:.0f} points/s"
+            )
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--max-n", type=int, default=None)
+    parser.add_argument(
+        "--selectivities", type=float, nargs="+", default=SELECTIVITIES
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--build-repeats", type=int, default=3)
+    parser.add_argument("--ingest-max-n", type=int, default=10**6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="pst_benchmark.json")
+    args = parser.parse_args(argv)
+
+    sizes = [n for n in args.sizes if args.max_n is None or n <= args.max_n]
+    results = []
+    for n in sizes:
+        results.extend(bench_size(n, args))
+        if n <= args.ingest_max_n:
+            results.extend(bench_ingest(n, args))
+
+    report = {
+        "meta": {
+            "seed": args.seed,
+            "queries": args.queries,
+            "warmup": args.warmup,
+            "repeats": args.repeats,
+            "build_repeats": args.build_repeats,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
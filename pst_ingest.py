@@ -0,0 +1,120 @@
+import itertools
+import os
+import time
+
+import numpy as np
+
+from array_pst import buildArrayPSTFromArrays
+
+
+def iter_csv_chunks(
+    path, chunk_size=1_000_000, dtype=np.float64, delimiter=",", skip_header=0
+):
+    """
+    Stream points from a CSV file with x and y in the first two columns.
+    Args:
+        path: CSV file path
+        chunk_size: Maximum number of rows parsed at a time
+        dtype: NumPy dtype of the coordinates
+        delimiter: Column separator
+        skip_header: Number of leading lines to skip
+    Yields:
+        (x, y) arrays of at most chunk_size points.
+    """
+    with open(path) as f:
+        for _ in range(skip_header):
+            next(f, None)
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                return
+            chunk = np.loadtxt(
+                lines, delimiter=delimiter, dtype=dtype, usecols=(0, 1), ndmin=2
+            )
+            yield chunk[:, 0], chunk[:, 1]
+
+
+def iter_binary_chunks(path, dtype="<i4", chunk_size=1_000_000):
+    """
+    Stream points from a raw binary file of interleaved x, y values.
+    The file is memory-mapped and the chunks are views into it, so nothing is
+    read until the values are used.
+    Args:
+        path: Binary file path
+        dtype: Little-endian coordinate type, "<i4" (int32) or "<f8" (float64)
+        chunk_size: Maximum number of points per chunk
+    Yields:
+        (x, y) arrays of at most chunk_size points.
+    Raises:
+        ValueError: If the file size is not a whole number of points.
+    """
+    dtype = np.dtype(dtype)
+    # An empty file cannot be memory-mapped; it simply holds no points
+    if os.path.getsize(path) == 0:
+        return
+    data = np.memmap(path, dtype=dtype, mode="r")
+    if len(data) % 2:
+        raise ValueError(f"{path} does not hold whole (x, y) pairs")
+    points = data.reshape(-1, 2)
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start : start + chunk_size]
+        yield chunk[:, 0], chunk[:, 1]
+
+
+def load_point_arrays(chunks, dtype=None):
+    """
+    Collect streamed (x, y) chunks into two contiguous arrays.
+    The output arrays grow geometrically, so each point is copied a constant
+    number of times on average and no Python objects are created per point.
+    Returns:
+        (x, y) arrays.
+    """
+    x = y = None
+    size = 0
+    for chunk_x, chunk_y in chunks:
+        if x is None:
+            if dtype is None:
+                dtype = np.result_type(chunk_x, chunk_y)
+            x = np.empty(max(len(chunk_x), 1), dtype=dtype)
+            y = np.empty(max(len(chunk_x), 1), dtype=dtype)
+        if size + len(chunk_x) > len(x):
+            capacity = max(2 * len(x), size + len(chunk_x))
+            x = np.resize(x, capacity)
+            y = np.resize(y, capacity)
+        x[size : size + len(chunk_x)] = chunk_x
+        y[size : size + len(chunk_y)] = chunk_y
+        size += len(chunk_x)
+    if x is None:
+        return np.empty(0, dtype=dtype), np.empty(0, dtype=dtype)
+    return x[:size], y[:size]
+
+
+def build_pst_from_csv(path, chunk_size=1_000_000, **options):
+    """Build an ArrayPST from a CSV file; options go to iter_csv_chunks."""
+    x, y = load_point_arrays(iter_csv_chunks(path, chunk_size, **options))
+    return buildArrayPSTFromArrays(x, y)
+
+
+def build_pst_from_binary(path, dtype="<i4", chunk_size=1_000_000):
+    """Build an ArrayPST from a raw little-endian binary point file."""
+    x, y = load_point_arrays(
+        iter_binary_chunks(path, dtype, chunk_size),
+        dtype=np.dtype(dtype).newbyteorder("="),
+    )
+    return buildArrayPSTFromArrays(x, y)
+
+
+def ingest_throughput(path, fmt, **options):
+    """
+    Time streaming every point of a file into coordinate arrays.
+    Args:
+        path: File path
+        fmt: "csv" or "binary"
+    Returns:
+        (number of points, points per second)
+    """
+    chunks = iter_csv_chunks if fmt == "csv" else iter_binary_chunks
+    start_time = time.perf_counter()
+    x, _ = load_point_arrays(chunks(path, **options))
+    elapsed = time.perf_counter() - start_time
+    return len(x), len(x) / elapsed if elapsed else float("inf")
@@ -0,0 +1,329 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from array_pst import ArrayPST, PSTRangeSearchBatch, _pst_layout, buildArrayPST
+from priority_search_tree import generate_points
+
+
+def _take_top(xs, ys, remaining):
+    """
+    NumPy version of _PSTBuilder.take for the top levels of a parallel build.
+    Each call scans its m remaining positions with vectorized operations,
+    which over the few top levels is cheaper than building a segment tree
+    over all n points in this process. Medians are computed on Python
+    numbers, as _pst_layout does, so int32 coordinates cannot overflow.
+    Args:
+        xs, ys: Coordinates sorted by x
+        remaining: Sorted positions of the points of the subtree
+    Returns:
+        (position of the node point, median, remaining positions of the left
+        subtree, remaining positions of the right subtree)
+    """
+    j = int(np.argmax(ys[remaining]))
+    p = int(remaining[j])
+    m = len(remaining)
+
+    median = 0
+    if m == 2:
+        a, b = remaining
+        min_y_pos = a if ys[a] <= ys[b] else b
+        median = (xs[p].item() + xs[min_y_pos].item()) // 2
+
+    remaining = np.delete(remaining, j)
+    mid = (m - 1) // 2
+    if mid >= 1:
+        median = (xs[remaining[mid - 1]].item() + xs[remaining[mid]].item()) // 2
+
+    cut = int(np.searchsorted(xs[remaining], median, side="right"))
+    return p, median, remaining[:cut], remaining[cut:]
+
+
+def buildArrayPSTParallel(points, workers=None, split_depth=4, dtype=None):
+    """
+    Build an ArrayPST with the subtrees below split_depth built in parallel.
+    The top split_depth levels are built in this process; every subtree
+    hanging below them depends only on its own points, so each one is laid
+    out by a ProcessPoolExecutor worker and the results are stitched into
+    one set of arrays. The tree has the same shape as buildArrayPST, but the
+    nodes are numbered top levels first, then one block per subtree.
+    Args:
+        points: List of points (x, y), in any order
+        workers: Number of worker processes (os.cpu_count() if None)
+        split_depth: Depth below which subtrees are handed to the workers
+        dtype: NumPy dtype for x, y and median (inferred from the points if None)
+    Returns:
+        An ArrayPST.
+    """
+    if len(points) == 0:
+        return buildArrayPST(points, dtype=dtype)
+
+    coords = np.array(points, dtype=dtype).reshape(-1, 2)
+    order = np.argsort(coords[:, 0], kind="stable")
+    xs = coords[order, 0]
+    ys = coords[order, 1]
+
+    pos = []
+    medians = []
+    left = []
+    right = []
+    tasks = []
+    frontier = [(np.arange(len(xs)), -1, False)]
+    for depth in range(split_depth + 1):
+        next_frontier = []
+        for remaining, parent, is_right in frontier:
+            if depth == split_depth:
+                tasks.append((remaining, parent, is_right))
+                continue
+            p, median, left_rem, right_rem = _take_top(xs, ys, remaining)
+
+            node = len(pos)
+            pos.append(p)
+            medians.append(median)
+            left.append(-1)
+            right.append(-1)
+            if parent >= 0:
+                if is_right:
+                    right[parent] = node
+                else:
+                    left[parent] = node
+            if len(left_rem):
+                next_frontier.append((left_rem, node, False))
+            if len(right_rem):
+                next_frontier.append((right_rem, node, True))
+        frontier = next_frontier
+
+    pos = [np.array(pos, dtype=np.int64)]
+    medians = [np.array(medians, dtype=coords.dtype)]
+    left = [np.array(left, dtype=np.int64)]
+    right = [np.array(right, dtype=np.int64)]
+    offset = len(pos[0])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        layouts = executor.map(
+            _pst_layout,
+            [xs[remaining] for remaining, _, _ in tasks],
+            [ys[remaining] for remaining, _, _ in tasks],
+        )
+        for (remaining, parent, is_right), layout in zip(tasks, layouts):
+            sub_pos, sub_medians, sub_left, sub_right = layout
+            pos.append(remaining[sub_pos])
+            medians.append(sub_medians)
+            left.append(np.where(sub_left >= 0, sub_left.astype(np.int64) + offset, -1))
+            right.append(
+                np.where(sub_right >= 0, sub_right.astype(np.int64) + offset, -1)
+            )
+            if parent < 0:
+                pass  # split_depth == 0: the whole tree is one subtree
+            elif is_right:
+                right[0][parent] = offset
+            else:
+                left[0][parent] = offset
+            offset += len(sub_pos)
+
+    pos = np.concatenate(pos)
+    index_dtype = np.int32 if len(points) < 2**31 else np.int64
+    return ArrayPST(
+        x=xs[pos],
+        y=ys[pos],
+        median=np.concatenate(medians),
+        left=np.concatenate(left).astype(index_dtype),
+        right=np.concatenate(right).astype(index_dtype),
+        index=order[pos].astype(index_dtype),
+    )
+
+
+def share_pst(tree):
+    """
+    Copy an ArrayPST into one multiprocessing.shared_memory block.
+    Returns:
+        (shm, descriptor) where descriptor is a small picklable dict that
+        attach_pst uses to map the same memory in another process. The
+        caller owns shm and must close() and unlink() it when done.
+    """
+    sections = []
+    offset = 0
+    for name, array in tree.sections().items():
+        offset = -(-offset // 64) * 64
+        sections.append((name, array.dtype.str, offset))
+        offset += array.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (_, dtype, offset), array in zip(sections, tree.sections().values()):
+        view = np.ndarray(len(tree), dtype=dtype, buffer=shm.buf, offset=offset)
+        view[:] = array
+    return shm, {"name": shm.name, "n": len(tree), "sections": sections}
+
+
+def attach_pst(descriptor):
+    """
+    Map a tree shared with share_pst without copying it.
+    Returns:
+        (shm, tree); keep shm alive for as long as the tree is used.
+    """
+    shm = shared_memory.SharedMemory(name=descriptor["name"])
+    arrays = {
+        name: np.ndarray(descriptor["n"], dtype=dtype, buffer=shm.buf, offset=offset)
+        for name, dtype, offset in descriptor["sections"]
+    }
+    return shm, ArrayPST.from_sections(arrays)
+
+
+_worker_shm = None
+_worker_tree = None
+
+
+def _attach_worker(descriptor):
+    global _worker_shm, _worker_tree
+    _worker_shm, _worker_tree = attach_pst(descriptor)
+
+
+def _range_search_chunk(queries):
+    return PSTRangeSearchBatch(queries, _worker_tree)
+
+
+class PSTQueryPool:
+    """
+    Pool of worker processes answering queries against one shared ArrayPST.
+    The tree is copied once into shared memory and every worker maps it
+    zero-copy, so N workers cost one tree in RAM and are not limited by the
+    GIL. Use as a context manager, or call close() to stop the workers and
+    free the shared memory.
+    Args:
+        tree: The ArrayPST to serve
+        workers: Number of worker processes (os.cpu_count() if None)
+    """
+
+    def __init__(self, tree, workers=None):
+        self.shm, descriptor = share_pst(tree)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach_worker, initargs=(descriptor,)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+        self.shm.close()
+        self.shm.unlink()
+
+    def range_search_batch(self, queries, chunk_size=1000):
+        """
+        Answer an (m, 4) array of (x1, x2, y1, y2) queries across the workers.
+        Returns:
+            (offsets, indices) in CSR form, as for PSTRangeSearchBatch.
+        """
+        queries = np.asarray(queries).reshape(-1, 4)
+        chunks = [
+            queries[start : start + chunk_size]
+            for start in range(0, len(queries), chunk_size)
+        ]
+        offsets = [np.zeros(1, dtype=np.int64)]
+        indices = []
+        total = 0
+        for chunk_offsets, chunk_indices in self.executor.map(
+            _range_search_chunk, chunks
+        ):
+            offsets.append(chunk_offsets[1:] + total)
+            indices.append(chunk_indices)
+            total += len(chunk_indices)
+        if not indices:
+            return offsets[0], np.empty(0, dtype=np.int64)
+        return np.concatenate(offsets), np.concatenate(indices)
+
+
+def _same_shape(a, b):
+    # Walk two ArrayPSTs together; node numbering may differ
+    if len(a) != len(b):
+        return False
+    stack = [(0, 0)] if len(a) else []
+    while stack:
+        i, j = stack.pop()
+        if (a.x[i], a.y[i], a.median[i], a.index[i]) != (
+            b.x[j],
+            b.y[j],
+            b.median[j],
+            b.index[j],
+        ):
+            return False
+        for children_a, children_b in [(a.left, b.left), (a.right, b.right)]:
+            if (children_a[i] < 0) != (children_b[j] < 0):
+                return False
+            if children_a[i] >= 0:
+                stack.append((children_a[i], children_b[j]))
+    return True
+
+
+def test_int32_limits():
+    import random
+
+    # Coordinates near the int32 limits, where sums of two overflow
+    for low, high in [(2**31 - 1000, 2**31 - 1), (-(2**31), -(2**31) + 1000)]:
+        points = [
+            (random.randint(low, high), random.randint(low, high)) for _ in range(500)
+        ]
+        points += [(high, 1)] * 5
+        expected = buildArrayPST(points, dtype=np.int32)
+        for split_depth in [0, 2, 4]:
+            tree = buildArrayPSTParallel(
+                points, workers=2, split_depth=split_depth, dtype=np.int32
+            )
+            assert _same_shape(tree, expected), (low, high, split_depth)
+    print("int32 parallel builds match buildArrayPST")
+
+
+def test_parallel_build(n=10_000_000, split_depth=4):
+    points = generate_points(n, (0, 10**9), (0, 10**9))
+    print(f"Testing with {n} points...")
+
+    start_time = time.perf_counter()
+    buildArrayPST(points)
+    sequential_time = time.perf_counter() - start_time
+    print(f"Sequential build time: {sequential_time:.6f} seconds")
+
+    workers = 1
+    while True:
+        start_time = time.perf_counter()
+        buildArrayPSTParallel(points, workers=workers, split_depth=split_depth)
+        parallel_time = time.perf_counter() - start_time
+        print(
+            f"Parallel build with {workers} workers: {parallel_time:.6f} seconds, "
+            f"speedup {sequential_time / parallel_time:.2f}x"
+        )
+        if workers >= os.cpu_count():
+            break
+        workers = min(workers * 2, os.cpu_count())
+
+
+def test_query_pool(n=1_000_000, num_queries=100_000):
+    import random
+
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    tree = buildArrayPSTParallel(points, split_depth=4)
+    queries = []
+    for _ in range(num_queries):
+        x1 = random.randint(0, 10**6 - 10**4)
+        y1 = random.randint(0, 10**6 - 10**4)
+        queries.append((x1, x1 + 10**4, y1, y1 + 10**5))
+    queries = np.array(queries)
+    print(f"Testing {num_queries} queries on {n} points...")
+
+    for workers in range(1, os.cpu_count() + 1):
+        with PSTQueryPool(tree, workers=workers) as pool:
+            # Warm up so worker start-up is not timed
+            pool.range_search_batch(queries[:workers])
+            start_time = time.perf_counter()
+            pool.range_search_batch(queries)
+            pool_time = time.perf_counter() - start_time
+        print(f"{workers} workers: {num_queries / pool_time:.0f} queries per second")
+
+
+if __name__ == "__main__":
+    test_int32_limits()
+    test_parallel_build()
+    test_query_pool()
@@ -0,0 +1,178 @@
+import logging
+import math
+import random
+import time
+
+import numpy as np
+
+from priority_search_tree import (
+    PSTRangeCount,
+    PSTRangeSearchIterative,
+    PSTSearchIterative,
+    augmentPST,
+    buildPSTFast,
+    generate_points,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPlanner:
+    """
+    Chooses between a PST traversal and a vectorized scan for each query.
+    A 2D histogram built next to the tree estimates how many points a query
+    rectangle holds (assuming points are spread evenly inside each cell).
+    Queries whose estimated selectivity is below scan_threshold walk the PST;
+    wider ones scan the coordinate arrays with NumPy, which touches every
+    point but at C speed. Counts always use the augmented PSTRangeCount.
+    Every decision is logged at DEBUG level and tallied in self.decisions.
+    Args:
+        points: List of points (x, y)
+        bins: Number of histogram cells along each axis
+        scan_threshold: Estimated selectivity at or above which to scan
+    """
+
+    def __init__(self, points, bins=64, scan_threshold=0.05):
+        self.root = augmentPST(buildPSTFast(points))
+        coords = np.array(points).reshape(-1, 2)
+        self.xs = coords[:, 0]
+        self.ys = coords[:, 1]
+        self.n = len(coords)
+        self.scan_threshold = scan_threshold
+        self.decisions = {"tree": 0, "scan": 0, "count": 0}
+        if self.n:
+            self.hist, self.x_edges, self.y_edges = np.histogram2d(
+                self.xs, self.ys, bins=bins
+            )
+        else:
+            self.hist = self.x_edges = self.y_edges = None
+
+    @staticmethod
+    def _overlap(lo, hi, edges):
+        # Fraction of each histogram cell covered by [lo, hi]
+        widths = np.diff(edges)
+        covered = np.minimum(edges[1:], hi) - np.maximum(edges[:-1], lo)
+        fraction = np.clip(covered, 0, None) / np.where(widths > 0, widths, 1)
+        # A zero-width cell (all points on one value) is in or out entirely
+        flat = widths == 0
+        fraction[flat] = (lo <= edges[:-1][flat]) & (edges[:-1][flat] <= hi)
+        return np.clip(fraction, 0, 1)
+
+    def estimate(self, x1, x2, y1, y2=math.inf):
+        """Estimated fraction of the points inside the query rectangle."""
+        if not self.n:
+            return 0.0
+        wx = self._overlap(x1, x2, self.x_edges)
+        wy = self._overlap(y1, y2, self.y_edges)
+        return float(wx @ self.hist @ wy) / self.n
+
+    def plan(self, x1, x2, y1, y2=math.inf):
+        selectivity = self.estimate(x1, x2, y1, y2)
+        plan = "scan" if selectivity >= self.scan_threshold else "tree"
+        return plan, selectivity
+
+    def _scan(self, x1, x2, y1, y2):
+        xs = self.xs
+        ys = self.ys
+        mask = (xs >= x1) & (xs <= x2) & (ys >= y1)
+        if y2 != math.inf:
+            mask &= ys <= y2
+        return list(zip(xs[mask].tolist(), ys[mask].tolist()))
+
+    def _run(self, operation, x1, x2, y1, y2):
+        plan, selectivity = self.plan(x1, x2, y1, y2)
+        self.decisions[plan] += 1
+        logger.debug(
+            "%s (%s, %s, %s, %s): estimated selectivity %.4f -> %s",
+            operation, x1, x2, y1, y2, selectivity, plan,
+        )
+        if plan == "scan":
+            return self._scan(x1, x2, y1, y2)
+        if y2 == math.inf:
+            return PSTSearchIterative(x1, x2, y1, self.root)
+        return PSTRangeSearchIterative(x1, x2, y1, y2, self.root)
+
+    def search(self, x1, x2, y1):
+        """Three-sided query, like PSTSearch."""
+        return self._run("search", x1, x2, y1, math.inf)
+
+    def range_search(self, x1, x2, y1, y2):
+        """Four-sided query, like PSTRangeSearch."""
+        return self._run("range_search", x1, x2, y1, y2)
+
+    def count(self, x1, x2, y1, y2=math.inf):
+        """Number of points in the query, without listing them."""
+        self.decisions["count"] += 1
+        logger.debug("count (%s, %s, %s, %s) -> count", x1, x2, y1, y2)
+        return PSTRangeCount(x1, x2, y1, y2, self.root)
+
+    def calibrate(
+        self, selectivities=(0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1.0), samples=20
+    ):
+        """
+        Time both plans on random squares of each selectivity and set
+        scan_threshold to the lowest selectivity where the scan was faster.
+        Returns:
+            {selectivity: (tree seconds, scan seconds)}
+        """
+        if not self.n:
+            return {}
+        x_lo, x_hi = self.x_edges[0], self.x_edges[-1]
+        y_lo, y_hi = self.y_edges[0], self.y_edges[-1]
+        timings = {}
+        threshold = math.inf
+        for selectivity in selectivities:
+            side = math.sqrt(selectivity)
+            queries = []
+            for _ in range(samples):
+                x1 = x_lo + random.random() * (1 - side) * (x_hi - x_lo)
+                y1 = y_lo + random.random() * (1 - side) * (y_hi - y_lo)
+                queries.append(
+                    (x1, x1 + side * (x_hi - x_lo), y1, y1 + side * (y_hi - y_lo))
+                )
+
+            start_time = time.perf_counter()
+            for query in queries:
+                PSTRangeSearchIterative(*query, self.root)
+            tree_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            for query in queries:
+                self._scan(*query)
+            scan_time = time.perf_counter() - start_time
+
+            timings[selectivity] = (tree_time, scan_time)
+            if scan_time < tree_time:
+                threshold = min(threshold, selectivity)
+        self.scan_threshold = threshold
+        logger.info("calibrated scan threshold: %s", threshold)
+        return timings
+
+
+def test_planner():
+    logging.basicConfig(level=logging.INFO)
+    points = generate_points(100000, (0, 10**6), (0, 10**6))
+    planner = QueryPlanner(points)
+    for selectivity, (tree_time, scan_time) in planner.calibrate().items():
+        print(
+            f"Selectivity {selectivity}: tree {tree_time:.6f} s, scan {scan_time:.6f} s"
+        )
+    print(f"Scan threshold: {planner.scan_threshold}")
+
+    queries = [
+        (400000, 410000, 900000, 910000),
+        (0, 500000, 0, 500000),
+        (0, 10**6, 0, 10**6),
+    ]
+    for x1, x2, y1, y2 in queries:
+        plan, selectivity = planner.plan(x1, x2, y1, y2)
+        result = planner.range_search(x1, x2, y1, y2)
+        print(
+            f"Query: x1={x1}, x2={x2}, y1={y1}, y2={y2}: estimated {selectivity:.4f}, "
+            f"plan {plan}, Results: {len(result)}"
+        )
+    print(f"Decisions: {planner.decisions}")
+
+
+if __name__ == "__main__":
+    test_planner()
@@ -0,0 +1,276 @@
+"""
+Local asyncio query server for an ArrayPST, with a load-generator client.
+
+Protocol: one JSON object per line in each direction.
+    request:  {"id": 1, "op": "search" | "range_search" | "count",
+               "query": [x1, x2, y1, y2]}   (y2 may be left out for "search")
+    response: {"id": 1, "points": [[x, y], ...]}  or  {"id": 1, "count": 3}
+              or  {"id": 1, "error": "..."} for a request that cannot be run
+Responses are written as soon as their batch is answered, so they may come
+back out of order; clients match them by id.
+
+    python pst_server.py serve --pst points.pst --port 8765
+    python pst_server.py client --port 8765 --requests 10000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+from array_pst import PSTRangeSearchBatch, PSTSearchBatch, buildArrayPST, load_pst
+from priority_search_tree import generate_points
+
+# Longest line either side accepts; large result sets make long lines
+LINE_LIMIT = 2**26
+OPS = ("search", "range_search", "count")
+
+
+def _check_request(request):
+    """Return why a decoded request cannot be answered, or None if it can."""
+    if not isinstance(request, dict):
+        return "request must be a JSON object"
+    if request.get("op") not in OPS:
+        return f"op must be one of {', '.join(OPS)}"
+    query = request.get("query")
+    sides = (3, 4) if request["op"] == "search" else (4,)
+    if not isinstance(query, list) or len(query) not in sides:
+        return f"query must be a list of {' or '.join(map(str, sides))} numbers"
+    if not all(
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+        for value in query
+    ):
+        return "query values must be numbers"
+    return None
+
+
+class PSTServer:
+    """
+    Serves queries against one ArrayPST loaded once for all connections.
+    Requests that arrive close together are coalesced: the first request of
+    a batch waits up to max_delay seconds for up to max_batch - 1 others, and
+    the whole batch is answered with one PSTSearchBatch / PSTRangeSearchBatch
+    call per query type.
+    Args:
+        tree: The ArrayPST to serve
+        max_batch: Maximum number of queries answered together
+        max_delay: Longest time in seconds a query waits for its batch to fill
+    """
+
+    def __init__(self, tree, max_batch=1024, max_delay=0.001):
+        self.tree = tree
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        # Coordinates by input index, to turn batch results back into points
+        self.xs = np.empty_like(tree.x)
+        self.ys = np.empty_like(tree.y)
+        self.xs[tree.index] = tree.x
+        self.ys[tree.index] = tree.y
+        self.queue = None
+        self.batches = 0
+        self.queries = 0
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        """Start listening on TCP host:port, or on a Unix socket at path."""
+        self.queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batches())
+        if path is not None:
+            return await asyncio.start_unix_server(
+                self._handle, path=path, limit=LINE_LIMIT
+            )
+        return await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+
+    async def _handle(self, reader, writer):
+        pending = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    self._write(writer, {"id": None, "error": f"invalid JSON: {exc}"})
+                    continue
+                error = _check_request(request)
+                if error is not None:
+                    request_id = request.get("id") if isinstance(request, dict) else None
+                    self._write(writer, {"id": request_id, "error": error})
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((request, future))
+                task = asyncio.create_task(self._respond(request, future, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write(writer, response):
+        writer.write(json.dumps(response).encode() + b"\n")
+
+    async def _respond(self, request, future, writer):
+        try:
+            response = await future
+        except Exception as exc:
+            response = {"error": f"{type(exc).__name__}: {exc}"}
+        response["id"] = request.get("id")
+        self._write(writer, response)
+        await writer.drain()
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._answer(batch)
+
+    def _answer(self, batch):
+        # A failure must not stop the batcher: fail this batch's queries instead
+        try:
+            self._answer_batch(batch)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+
+    def _answer_batch(self, batch):
+        self.batches += 1
+        self.queries += len(batch)
+        three_sided = [item for item in batch if item[0]["op"] == "search"]
+        four_sided = [item for item in batch if item[0]["op"] != "search"]
+        for items, search in [
+            (three_sided, PSTSearchBatch),
+            (four_sided, PSTRangeSearchBatch),
+        ]:
+            if not items:
+                continue
+            # y2 of a three-sided query is ignored by PSTSearchBatch
+            queries = np.array([(request["query"] + [0])[:4] for request, _ in items])
+            offsets, indices = search(queries, self.tree)
+            for k, (request, future) in enumerate(items):
+                if future.cancelled():
+                    continue
+                if request["op"] == "count":
+                    future.set_result({"count": int(offsets[k + 1] - offsets[k])})
+                    continue
+                hits = indices[offsets[k] : offsets[k + 1]]
+                points = list(
+                    zip(self.xs[hits].tolist(), self.ys[hits].tolist())
+                )
+                future.set_result({"points": points})
+
+
+async def run_load(
+    host="127.0.0.1",
+    port=8765,
+    path=None,
+    num_requests=10000,
+    concurrency=32,
+    op="range_search",
+    coord_max=10**6,
+    side=10**4,
+):
+    """
+    Send num_requests queries over `concurrency` connections, each keeping
+    one request in flight, and measure throughput and latency.
+    Returns:
+        Dict with requests per second and p50/p95/p99 latency in seconds.
+    """
+    latencies = []
+
+    async def worker(count):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        for i in range(count):
+            x1 = random.randint(0, coord_max - side)
+            y1 = random.randint(0, coord_max - side)
+            request = {"id": i, "op": op, "query": [x1, x1 + side, y1, y1 + side]}
+            start_time = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            await reader.readline()
+            latencies.append(time.perf_counter() - start_time)
+        writer.close()
+        await writer.wait_closed()
+
+    per_worker = [num_requests // concurrency] * concurrency
+    for i in range(num_requests % concurrency):
+        per_worker[i] += 1
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker(count) for count in per_worker if count))
+    elapsed = time.perf_counter() - start_time
+
+    latencies = np.array(latencies)
+    return {
+        "requests": len(latencies),
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_s": float(np.percentile(latencies, 50)),
+        "p95_s": float(np.percentile(latencies, 95)),
+        "p99_s": float(np.percentile(latencies, 99)),
+    }
+
+
+async def _serve(args):
+    if args.pst:
+        tree = load_pst(args.pst)
+    else:
+        tree = buildArrayPST(generate_points(args.points, (0, 10**6), (0, 10**6)))
+    server = PSTServer(tree, max_batch=args.max_batch, max_delay=args.max_delay)
+    listener = await server.start(args.host, args.port, args.unix)
+    print(f"Serving {len(tree)} points")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ["serve", "client"]:
+        command = commands.add_parser(name)
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8765)
+        command.add_argument("--unix", default=None, help="Unix socket path")
+    serve = commands.choices["serve"]
+    serve.add_argument("--pst", help="File written by save_pst")
+    serve.add_argument("--points", type=int, default=1_000_000)
+    serve.add_argument("--max-batch", type=int, default=1024)
+    serve.add_argument("--max-delay", type=float, default=0.001)
+    client = commands.choices["client"]
+    client.add_argument("--requests", type=int, default=10000)
+    client.add_argument("--concurrency", type=int, default=32)
+    client.add_argument(
+        "--op", choices=["search", "range_search", "count"], default="range_search"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        asyncio.run(_serve(args))
+    else:
+        report = asyncio.run(
+            run_load(
+                args.host,
+                args.port,
+                args.unix,
+                num_requests=args.requests,
+                concurrency=args.concurrency,
+                op=args.op,
+            )
+        )
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
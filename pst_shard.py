@@ -0,0 +1,288 @@
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from array_pst import (
+    ArrayPSTRangeSearch,
+    ArrayPSTSearch,
+    PSTRangeSearchBatch,
+    PSTSearchBatch,
+    buildArrayPSTFromArrays,
+    load_pst,
+    save_pst,
+)
+from priority_search_tree import generate_points
+from pst_parallel import attach_pst, share_pst
+
+MANIFEST = "shards.json"
+
+
+class ShardedPST:
+    """
+    Points partitioned by x into K independently built ArrayPSTs.
+    Shard i holds a contiguous run of the x-sorted points and covers
+    [min_x[i], max_x[i]]; a query only touches the shards its x-range
+    overlaps. Each shard's index refers to positions in the original input,
+    so results from different shards can be merged directly.
+    Args:
+        shards: List of ArrayPSTs
+        min_x, max_x: x-range of each shard
+        paths: File of each shard when persisted, else None
+    """
+
+    def __init__(self, shards, min_x, max_x, paths=None):
+        self.shards = shards
+        self.min_x = np.asarray(min_x)
+        self.max_x = np.asarray(max_x)
+        self.paths = paths
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def shards_for(self, x1, x2):
+        """Indices of the shards whose x-range overlaps [x1, x2]."""
+        return np.flatnonzero((self.min_x <= x2) & (self.max_x >= x1)).tolist()
+
+    def search(self, x1, x2, y1):
+        """Three-sided query in this process, like PSTSearch."""
+        result = []
+        for i in self.shards_for(x1, x2):
+            result.extend(ArrayPSTSearch(x1, x2, y1, self.shards[i]))
+        return result
+
+    def range_search(self, x1, x2, y1, y2):
+        """Four-sided query in this process, like PSTRangeSearch."""
+        result = []
+        for i in self.shards_for(x1, x2):
+            result.extend(ArrayPSTRangeSearch(x1, x2, y1, y2, self.shards[i]))
+        return result
+
+
+def _build_shard(x, y, ids, path=None):
+    # With a path the shard is saved here and only the path goes back, so
+    # built shards never pile up in the parent
+    tree = buildArrayPSTFromArrays(x, y)
+    tree.index = ids[tree.index].astype(tree.index.dtype)
+    if path is None:
+        return tree
+    save_pst(tree, path)
+    return path
+
+
+def buildShardedPST(points, num_shards=4, directory=None, workers=None, dtype=None):
+    """
+    Partition points by x into num_shards shards of equal size and build them
+    in parallel.
+    Args:
+        points: List of points (x, y), in any order
+        num_shards: Number of shards K
+        directory: If given, each build process saves its shard there with
+            save_pst, next to a manifest, and the shards are memory-mapped
+            back instead of kept in RAM
+        workers: Number of build processes (os.cpu_count() if None)
+        dtype: NumPy dtype for x, y and median (inferred from the points if None)
+    Returns:
+        A ShardedPST.
+    """
+    coords = np.array(points, dtype=dtype).reshape(-1, 2)
+    order = np.argsort(coords[:, 0], kind="stable")
+    xs = coords[order, 0]
+    ys = coords[order, 1]
+    cuts = np.linspace(0, len(xs), num_shards + 1).astype(np.int64)
+    ranges = [(a, b) for a, b in zip(cuts[:-1], cuts[1:]) if a < b]
+    files = [f"shard_{i}.pst" for i in range(len(ranges))]
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+        paths = [os.path.join(directory, name) for name in files]
+    else:
+        paths = [None] * len(ranges)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shards = list(
+            executor.map(
+                _build_shard,
+                [xs[a:b] for a, b in ranges],
+                [ys[a:b] for a, b in ranges],
+                [order[a:b] for a, b in ranges],
+                paths,
+            )
+        )
+    min_x = [xs[a] for a, _ in ranges]
+    max_x = [xs[b - 1] for _, b in ranges]
+
+    if directory is None:
+        return ShardedPST(shards, min_x, max_x)
+
+    manifest = {
+        "files": files,
+        "min_x": np.asarray(min_x).tolist(),
+        "max_x": np.asarray(max_x).tolist(),
+    }
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return load_sharded_pst(directory)
+
+
+def load_sharded_pst(directory, mmap=True):
+    """Open a ShardedPST saved by buildShardedPST, memory-mapping every shard."""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    paths = [os.path.join(directory, name) for name in manifest["files"]]
+    shards = [load_pst(path, mmap=mmap) for path in paths]
+    return ShardedPST(shards, manifest["min_x"], manifest["max_x"], paths)
+
+
+# Shards owned by this worker process, by shard number
+_worker_shards = {}
+_worker_shms = []
+
+
+def _attach_shards(sources):
+    for shard, (kind, source) in sources.items():
+        if kind == "file":
+            _worker_shards[shard] = load_pst(source)
+        else:
+            shm, tree = attach_pst(source)
+            _worker_shms.append(shm)
+            _worker_shards[shard] = tree
+
+
+def _shard_batch(shard, queries, four_sided):
+    search = PSTRangeSearchBatch if four_sided else PSTSearchBatch
+    return search(queries, _worker_shards[shard])
+
+
+class ShardedPSTPool:
+    """
+    Worker processes answering queries on a ShardedPST with scatter-gather.
+    Each worker owns a fixed subset of the shards (shard i goes to worker
+    i % workers) and maps only those, so no worker holds more than its share
+    of the index. Every query is sent only to the shards it overlaps, each
+    shard's batches run on its owner, the owners run in parallel and their
+    results are merged. Workers memory-map persisted shards from their
+    files; in-memory shards are copied once into shared memory. Use as a
+    context manager, or call close().
+    Args:
+        index: The ShardedPST
+        workers: Number of worker processes (os.cpu_count() if None), at
+            most one per shard
+    """
+
+    def __init__(self, index, workers=None):
+        self.index = index
+        self.shms = []
+        workers = max(1, min(workers or os.cpu_count(), len(index.shards)))
+        self.owner = [shard % workers for shard in range(len(index.shards))]
+        sources = [{} for _ in range(workers)]
+        for shard, tree in enumerate(index.shards):
+            if index.paths is not None:
+                source = ("file", index.paths[shard])
+            else:
+                shm, descriptor = share_pst(tree)
+                self.shms.append(shm)
+                source = ("shm", descriptor)
+            sources[self.owner[shard]][shard] = source
+        # One single-process pool per worker, so a shard's batches always
+        # reach the process that holds it
+        self.executors = [
+            ProcessPoolExecutor(
+                max_workers=1, initializer=_attach_shards, initargs=(owned,)
+            )
+            for owned in sources
+        ]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown()
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
+
+    def _scatter_gather(self, queries, four_sided, chunk_size):
+        queries = np.asarray(queries).reshape(-1, 4)
+        m = len(queries)
+        tasks = []
+        for shard in range(len(self.index.shards)):
+            overlaps = (queries[:, 0] <= self.index.max_x[shard]) & (
+                queries[:, 1] >= self.index.min_x[shard]
+            )
+            qids = np.flatnonzero(overlaps)
+            for start in range(0, len(qids), chunk_size):
+                chunk = qids[start : start + chunk_size]
+                future = self.executors[self.owner[shard]].submit(
+                    _shard_batch, shard, queries[chunk], four_sided
+                )
+                tasks.append((chunk, future))
+
+        owners = [np.empty(0, dtype=np.int64)]
+        indices = [np.empty(0, dtype=np.int64)]
+        for qids, future in tasks:
+            offsets, found = future.result()
+            owners.append(np.repeat(qids, np.diff(offsets)))
+            indices.append(found)
+        owners = np.concatenate(owners)
+        indices = np.concatenate(indices)
+
+        offsets = np.zeros(m + 1, dtype=np.int64)
+        np.cumsum(np.bincount(owners, minlength=m), out=offsets[1:])
+        return offsets, indices[np.argsort(owners, kind="stable")]
+
+    def search_batch(self, queries, chunk_size=1000):
+        """
+        Answer an (m, 4) array of three-sided queries; y2 is ignored.
+        Returns:
+            (offsets, indices) in CSR form, as for PSTSearchBatch.
+        """
+        return self._scatter_gather(queries, False, chunk_size)
+
+    def range_search_batch(self, queries, chunk_size=1000):
+        """
+        Answer an (m, 4) array of (x1, x2, y1, y2) queries.
+        Returns:
+            (offsets, indices) in CSR form, as for PSTRangeSearchBatch.
+        """
+        return self._scatter_gather(queries, True, chunk_size)
+
+
+def test_sharding(n=2_000_000, shard_counts=(1, 2, 4, 8), num_queries=20_000):
+    points = generate_points(n, (0, 10**6), (0, 10**6))
+    queries = []
+    for _ in range(num_queries):
+        x1 = random.randint(0, 10**6 - 10**4)
+        y1 = random.randint(0, 10**6 - 10**4)
+        queries.append((x1, x1 + 10**4, y1, y1 + 10**5))
+    queries = np.array(queries)
+    print(f"Testing with {n} points and {num_queries} queries...")
+
+    for num_shards in shard_counts:
+        workers = min(num_shards, os.cpu_count())
+        start_time = time.perf_counter()
+        index = buildShardedPST(points, num_shards, workers=workers)
+        build_time = time.perf_counter() - start_time
+        largest = max(shard.nbytes() for shard in index.shards)
+
+        with ShardedPSTPool(index, workers=workers) as pool:
+            # Warm up so worker start-up is not timed
+            pool.range_search_batch(queries[:workers])
+            start_time = time.perf_counter()
+            pool.range_search_batch(queries)
+            query_time = time.perf_counter() - start_time
+        print(
+            f"{num_shards} shards, {workers} workers: build {build_time:.6f} seconds, "
+            f"largest shard {largest / 2**20:.1f} MiB, "
+            f"{num_queries / query_time:.0f} queries per second"
+        )
+
+
+if __name__ == "__main__":
+    test_sharding()
@@ -1,3 +1,6 @@
+import heapq
+
+
 class TreeNode:
     def __init__(self, point=None):
         self.point = point
@@ -33,71 +36,86 @@ def build_balanced_bst(points):
     return root
 
 
-def build_pst(points):
+def build_pst_on_y(points, open_right):
     """
-    Build a Priority Search Tree (PST) from the given points.
+    Build a Priority Search Tree keyed on y and heap-ordered on x.
+    The tree is leaf-oriented: every point has a leaf, internal nodes route
+    on y with their median, and the slots are filled bottom-up by pulling the
+    best point of the children up, so the build takes O(n) for sorted input.
     Args:
-        points (list of tuples): List of points.
+        points (list of tuples): List of points sorted by y-coordinate.
+        open_right (bool): Heap-order on maximum x (for queries x >= x1) if
+            True, on minimum x (for queries x <= x2) otherwise.
     Returns:
         Node: Root of the PST.
     """
     if not points:
         return None
 
-    max_y_point = max(points, key=lambda p: p[1])
-    points.remove(max_y_point)
-
-    mid = len(points) // 2
-    median = max_y_point[0]
-    if mid >= 1:
-        median = (points[mid - 1][0] + points[mid][0]) // 2
-
-    left_points = points[: mid + 1]
-    right_points = points[mid + 1 :]
-
-    root = Node(median=median, point=max_y_point)
-    root.left = build_pst(left_points)
-    root.right = build_pst(right_points)
-
-    return root
+    def better(child, other):
+        if other.point is None:
+            return True
+        if child.point is None:
+            return False
+        if open_right:
+            return child.point[0] >= other.point[0]
+        return child.point[0] <= other.point[0]
+
+    def pull_up(node):
+        # Refill an empty slot from the children, all the way down
+        while node.left is not None:
+            child = node.left if better(node.left, node.right) else node.right
+            if child.point is None:
+                return
+            node.point = child.point
+            child.point = None
+            node = child
+
+    def build(lo, hi):
+        if hi - lo == 1:
+            return Node(median=points[lo][1], point=points[lo])
+        mid = (lo + hi) // 2
+        node = Node(median=points[mid - 1][1])
+        node.left = build(lo, mid)
+        node.right = build(mid, hi)
+        pull_up(node)
+        return node
+
+    return build(0, len(points))
 
 
 def augment_with_pst(bst):
     """
     Augment a balanced BST with Priority Search Trees (PSTs) at each node.
+    Built bottom-up: each node merges the y-sorted point lists of its children,
+    and every child gets a PST on its subtree's points built from the merged
+    list in linear time, for O(n log n) in total. A left child gets a PST for
+    queries x >= x1 and a right child one for queries x <= x2, which is all a
+    four-sided query needs below its split node.
     Args:
         bst (TreeNode): Root of the balanced BST.
     Returns:
         TreeNode: Root of the augmented Priority Range Tree.
     """
-    if bst is None:
-        return None
-
-    # Collect all points in the subtree
-    points = collect_points(bst)
-    bst.priority_tree = build_pst(points)
-
-    # Recur for left and right children
-    augment_with_pst(bst.left)
-    augment_with_pst(bst.right)
 
+    def augment(node):
+        # Returns the points of the subtree sorted by y
+        if node is None:
+            return []
+        left_points = augment(node.left)
+        right_points = augment(node.right)
+        if node.left is not None:
+            node.left.priority_tree = build_pst_on_y(left_points, open_right=True)
+        if node.right is not None:
+            node.right.priority_tree = build_pst_on_y(right_points, open_right=False)
+        return list(
+            heapq.merge(left_points, [node.point], right_points, key=lambda p: p[1])
+        )
+
+    augment(bst)
     return bst
 
 
-def collect_points(node):
-    """
-    Collect all points in the subtree rooted at the given node.
-    Args:
-        node (TreeNode): Root of the subtree.
-    Returns:
-        list of tuples: List of points in the subtree.
-    """
-    if node is None:
-        return []
-
-    return collect_points(node.left) + [node.point] + collect_points(node.right)
-
-
 def print_tree(node, level=0):
     """
     Print the Priority Range Tree.
@@ -125,70 +143,80 @@ priority_range_tree = augment_with_pst(bst)
 print_tree(priority_range_tree)
 
 
-def PSTSearch(x1, x2, y1, node):
+def PSTSearchOnY(x_bound, y1, y2, node, open_right):
     """
-    Perform a three-sided range search in a Priority Search Tree (PST).
+    Perform a three-sided range search in a PST built by build_pst_on_y.
     Args:
-        x1: Lower bound for x-coordinate
-        x2: Upper bound for x-coordinate
-        y1: Upper bound for y-coordinate
-        node: The current node in the PST
+        x_bound: Lower bound for x if open_right, upper bound otherwise
+        y1: Lower bound for y-coordinate
+        y2: Upper bound for y-coordinate
+        node: The root of the PST
+        open_right: The open_right value the PST was built with
     Returns:
         A list of points (x, y) that satisfy the range conditions.
     """
-    # Base case: If the node is None, return an empty list
-    if node is None:
-        return []
-
-    # If the y-coordinate of the point at the node is greater than y1, exclude this node
-    if node.point[1] < y1:
-        return []
-
-    # Check if the point at the node satisfies the x-range [x1, x2]
     result = []
-    if x1 <= node.point[0] and node.point[0] <= x2:
-        result.append(node.point)
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        # An empty slot means the whole subtree is empty
+        if node is None or node.point is None:
+            continue
+
+        # Heap order on x: nothing below can satisfy the x bound either
+        x, y = node.point
+        if (x < x_bound) if open_right else (x > x_bound):
+            continue
+        if y1 <= y <= y2:
+            result.append(node.point)
 
-    # Check the left and right subtrees based on the x-coordinate at this node
-    # Sometimes the medium is calculated by plus the left and right values so the node values is not the correct medium value
-    if x1 <= node.median:
-        result.extend(PSTSearch(x1, x2, y1, node.left))
-    if x2 > node.median:
-        result.extend(PSTSearch(x1, x2, y1, node.right))
+        # Equal y values may sit on both sides of the median
+        if y2 >= node.median:
+            stack.append(node.right)
+        if y1 <= node.median:
+            stack.append(node.left)
 
     return result
 
 
 def PSTRangeSearch(x1, x2, y1, y2, node):
     """
-    Perform a four-sided range search in a Priority Search Tree (PST).
+    Perform a four-sided range search in a Priority Range Tree.
+    Finds the split node where the paths to x1 and x2 diverge; every point in
+    its left subtree has x <= x2 and every point in its right subtree has
+    x >= x1, so one three-sided query on each child's PST answers the rest,
+    in O(log n + k) time overall.
     Args:
         x1: Lower bound for x-coordinate
         x2: Upper bound for x-coordinate
         y1: Lower bound for y-coordinate
         y2: Upper bound for y-coordinate
-        node: The current node in the PST
+        node: The root of the Priority Range Tree (augmented TreeNode)
     Returns:
         A list of points (x, y) that satisfy the range conditions.
     """
-    # Base case: If the node is None, return an empty list
+    # Find the split node
+    while node is not None:
+        if x2 < node.point[0]:
+            node = node.left
+        elif x1 > node.point[0]:
+            node = node.right
+        else:
+            break
     if node is None:
         return []
 
-    # Check if the point at the node satisfies the x-range [x1, x2]
     result = []
-    if x1 <= node.point[0] and node.point[0] <= x2:
-        # If the y-coordinate of the point at the node is outside the range [y1, y2], exclude this node
-        if y1 <= node.point[1] and node.point[1] <= y2:
-            result.append(node.point)
-        result.extend(PSTSearch(x1, y1, y2, node.left))
-        result.extend(PSTSearch(x2, y1, y2, node.right))
-
-    # Recursively search in left and right subtrees based on the x-range
-    elif node.point[0] < x1:  # Check right subtree
-        result.extend(PSTRangeSearch(x1, x2, y1, y2, node.right))
-    else:  # Check right subtree
-        result.extend(PSTRangeSearch(x1, x2, y1, y2, node.left))
+    if y1 <= node.point[1] <= y2:
+        result.append(node.point)
+    if node.left is not None:
+        result.extend(
+            PSTSearchOnY(x1, y1, y2, node.left.priority_tree, open_right=True)
+        )
+    if node.right is not None:
+        result.extend(
+            PSTSearchOnY(x2, y1, y2, node.right.priority_tree, open_right=False)
+        )
 
     return result
 